@@ -9,10 +9,10 @@ service configurations.
 Uses Pydantic Settings for robust validation and type safety.
 """
 
-import os
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from pydantic_settings import BaseSettings
-from pydantic import validator, PostgresDsn, field_validator
+from pydantic import field_validator, ValidationInfo
 
 
 class Settings(BaseSettings):
@@ -33,54 +33,58 @@ class Settings(BaseSettings):
     VERSION: str = "1.0.0"
     """API version for versioning and compatibility"""
     
-    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+    ENVIRONMENT: str = "development"
     """Current environment: development, staging, production"""
     
-    DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
+    DEBUG: bool = False
     """Enable debug mode (caution: exposes details in production)"""
     
     # ============ Database Configuration ============
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./ignux.db")
+    DATABASE_URL: str = "sqlite:///./ignux.db"
     """Database connection URL. Use PostgreSQL in production."""
     
-    DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", 5))
+    DATABASE_POOL_SIZE: int = 5
     """Database connection pool size"""
     
-    DATABASE_MAX_OVERFLOW: int = int(os.getenv("DATABASE_MAX_OVERFLOW", 10))
+    DATABASE_MAX_OVERFLOW: int = 10
     """Maximum number of connections that can be created beyond pool_size"""
     
-    DATABASE_POOL_RECYCLE: int = int(os.getenv("DATABASE_POOL_RECYCLE", 3600))
+    DATABASE_POOL_RECYCLE: int = 3600
     """Seconds after which a connection is recycled"""
     
     # ============ Email Configuration ============
-    SMTP_SERVER: str = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+    SMTP_SERVER: str = "smtp.gmail.com"
     """SMTP server for email notifications"""
     
-    SMTP_PORT: int = int(os.getenv("SMTP_PORT", 587))
+    SMTP_PORT: int = 587
     """SMTP server port"""
     
-    SMTP_USERNAME: str = os.getenv("SMTP_USERNAME", "")
+    SMTP_USERNAME: str = ""
     """SMTP authentication username"""
     
-    SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
+    SMTP_PASSWORD: str = ""
     """SMTP authentication password"""
     
-    EMAIL_FROM: str = os.getenv("EMAIL_FROM", "noreply@ignux.com")
+    SMTP_POOL_SIZE: int = 5
+    """Maximum number of idle authenticated SMTP connections kept for reuse"""
+    
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+    """Messages sent over one SMTP connection before it is recycled"""
+    
+    EMAIL_FROM: str = "noreply@ignux.com"
     """Default sender email address"""
     
-    EMAIL_ADMIN: str = os.getenv("EMAIL_ADMIN", "admin@ignux.com")
+    EMAIL_ADMIN: str = "admin@ignux.com"
     """Administrator email for notifications"""
     
     # ============ Security Settings ============
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "")
+    SECRET_KEY: str = ""
     """Secret key for JWT tokens and cryptographic operations"""
     
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(
-        os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60 * 24 * 8)
-    )
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
     """JWT token expiration time in minutes (8 days default)"""
     
-    ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
+    ALGORITHM: str = "HS256"
     """Algorithm used for JWT token signing"""
     
     CORS_ORIGINS: List[str] = [
@@ -92,50 +96,56 @@ class Settings(BaseSettings):
     """Allowed CORS origins for development"""
     
     # ============ Rate Limiting ============
-    RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", 60))
+    RATE_LIMIT_PER_MINUTE: int = 60
     """Requests per minute per IP for rate limiting"""
     
+    RATE_LIMIT_SHARD: str = "ip"
+    """Redis Cluster hash-tag axis for rate limit keys ("ip" or "path")"""
+    
     # ============ File Upload Configuration ============
-    MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", 10 * 1024 * 1024))
+    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
     """Maximum file upload size in bytes (default: 10MB)"""
     
     ALLOWED_FILE_TYPES: List[str] = ["jpg", "jpeg", "png", "pdf", "doc", "docx"]
     """Allowed file types for uploads"""
     
     # ============ Company Information ============
-    COMPANY_NAME: str = os.getenv("COMPANY_NAME", "IGNUX")
+    COMPANY_NAME: str = "IGNUX"
     """Official company name"""
     
-    BRAND_NAME: str = os.getenv("BRAND_NAME", "IGNUX Fireworks & Stage FX")
+    BRAND_NAME: str = "IGNUX Fireworks & Stage FX"
     """Brand/trading name"""
     
-    COMPANY_EMAIL: str = os.getenv("COMPANY_EMAIL", "konstantentertainment@gmail.com")
+    COMPANY_EMAIL: str = "konstantentertainment@gmail.com"
     """Primary company contact email"""
     
-    COMPANY_PHONE: str = os.getenv("COMPANY_PHONE", "+254750077424")
+    COMPANY_PHONE: str = "+254750077424"
     """Primary company phone number"""
     
-    COMPANY_ADDRESS: str = os.getenv("COMPANY_ADDRESS", "Nairobi, Kenya")
+    COMPANY_ADDRESS: str = "Nairobi, Kenya"
     """Company physical address"""
     
     # ============ Third-Party Services ============
-    WHATSAPP_PHONE: str = os.getenv("WHATSAPP_PHONE", "+254750077424")
+    WHATSAPP_PHONE: str = "+254750077424"
     """WhatsApp business phone number"""
     
-    GOOGLE_MAPS_API_KEY: Optional[str] = os.getenv("GOOGLE_MAPS_API_KEY")
+    GOOGLE_MAPS_API_KEY: Optional[str] = None
     """Google Maps API key for location services"""
     
     # ============ Monitoring & Logging ============
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVEL: str = "INFO"
     """Logging level: DEBUG, INFO, WARNING, ERROR, CRITICAL"""
     
-    SENTRY_DSN: Optional[str] = os.getenv("SENTRY_DSN")
+    SENTRY_DSN: Optional[str] = None
     """Sentry DSN for error tracking and monitoring"""
     
     # ============ Performance Settings ============
-    REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", 30))
+    REQUEST_TIMEOUT: int = 30
     """Default request timeout in seconds"""
     
+    STATS_ROLLUPS_ENABLED: bool = False
+    """Read dashboard stats from the PostgreSQL rollup views (stats_rollups.sql)"""
+    
     # Validators
     @field_validator("CORS_ORIGINS")
     @classmethod
@@ -158,9 +168,9 @@ class Settings(BaseSettings):
     
     @field_validator("SECRET_KEY")
     @classmethod
-    def validate_secret_key(cls, v: str) -> str:
+    def validate_secret_key(cls, v: str, info: ValidationInfo) -> str:
         """Ensure secret key is set in production."""
-        if cls.ENVIRONMENT == "production" and not v:
+        if info.data.get("ENVIRONMENT") == "production" and not v:
             raise ValueError("SECRET_KEY must be set in production environment")
         return v
     
@@ -172,36 +182,68 @@ class Settings(BaseSettings):
         extra = "ignore"  # Changed from "forbid" to "ignore" to allow extra env variables
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Return the process-wide settings instance, creating it on first use.
+    
+    Settings are no longer built at import time, so reading ``.env`` and
+    running the validators only happens once something needs a value.
+    """
+    return Settings()
+
+
+def __getattr__(name: str):
+    """Keep ``from app.config import settings`` working (PEP 562)."""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Environment flags, resolved on first use and then reused for the life
+# of the process (the environment cannot change once settings are built)
+_IS_PRODUCTION: Optional[bool] = None
+_IS_DEVELOPMENT: Optional[bool] = None
 
 
 def is_production() -> bool:
     """Helper function to check if running in production environment."""
-    return settings.ENVIRONMENT == "production"
+    global _IS_PRODUCTION
+    if _IS_PRODUCTION is None:
+        _IS_PRODUCTION = get_settings().ENVIRONMENT == "production"
+    return _IS_PRODUCTION
 
 
 def is_development() -> bool:
     """Helper function to check if running in development environment."""
-    return settings.ENVIRONMENT == "development"
+    global _IS_DEVELOPMENT
+    if _IS_DEVELOPMENT is None:
+        _IS_DEVELOPMENT = get_settings().ENVIRONMENT == "development"
+    return _IS_DEVELOPMENT
+
 
+_PRODUCTION_ORIGINS: Tuple[str, ...] = (
+    "https://ignux.com",
+    "https://www.ignux.com",
+    "https://api.ignux.com",
+)
+"""Origins served by the production deployment"""
 
-def get_cors_origins() -> List[str]:
+
+@lru_cache(maxsize=1)
+def get_cors_origins() -> Tuple[str, ...]:
     """
     Get CORS origins based on environment.
     
+    The result is environment-constant, so it is computed once and cached.
+    
     Returns:
-        List of allowed origins. In production, returns production domains.
-        In development, returns development origins plus production domains.
+        Tuple of allowed origins. In production, returns production domains.
+        In development, returns development origins plus production domains,
+        de-duplicated in first-seen order.
     """
-    production_origins = [
-        "https://ignux.com",
-        "https://www.ignux.com",
-        "https://api.ignux.com",
-    ]
-    
     if is_production():
-        return production_origins
+        return _PRODUCTION_ORIGINS
     else:
         # In development, allow both local and production origins
-        return list(set(settings.CORS_ORIGINS + production_origins))
\ No newline at end of file
+        return tuple(dict.fromkeys([*get_settings().CORS_ORIGINS, *_PRODUCTION_ORIGINS]))
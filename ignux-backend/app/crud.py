@@ -1,22 +1,47 @@
 # app/crud.py
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc
-from typing import List, Optional, Dict, Any
+from __future__ import annotations
+
+from sqlalchemy import asc, case, column, desc, func, literal, select, table, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, load_only
+from typing import TYPE_CHECKING, Iterator, List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
-import json
-from . import models, schemas
+from . import models
+from .config import get_settings
+
+if TYPE_CHECKING:
+    # Annotation-only import; schemas pulls in pydantic and is resolved
+    # lazily through the module-level __getattr__ below.
+    from . import schemas
+
+# Helpers
+def _update_returning(db: Session, model, row_id: int, values: Dict[str, Any]):
+    """
+    Apply ``values`` to one row with a single ``UPDATE ... RETURNING``.
+    
+    Returns the refreshed ORM instance, or None if no row matched. This
+    replaces the SELECT / UPDATE / refresh-SELECT sequence of loading the
+    object, mutating it and calling ``db.refresh``.
+    
+    ``populate_existing`` makes the RETURNING row overwrite an instance
+    already in the identity map; otherwise the ORM only synchronises it
+    with the raw ``values`` (e.g. a status as ``str``, not the enum).
+    """
+    stmt = (
+        update(model)
+        .where(model.id == row_id)
+        .values(values)
+        .returning(model)
+        .execution_options(populate_existing=True)
+    )
+    row = db.execute(stmt).scalar_one_or_none()
+    db.commit()
+    return row
 
 # Contact Messages CRUD
 def create_contact_message(db: Session, contact_data: schemas.ContactMessageCreate):
-    db_contact = models.ContactMessage(
-        name=contact_data.name,
-        email=contact_data.email,
-        phone=contact_data.phone,
-        event_type=contact_data.event_type,
-        event_date=contact_data.event_date,
-        budget=contact_data.budget,
-        message=contact_data.message
-    )
+    db_contact = models.ContactMessage(**contact_data.model_dump())
     db.add(db_contact)
     db.commit()
     db.refresh(db_contact)
@@ -24,9 +49,19 @@ def create_contact_message(db: Session, contact_data: schemas.ContactMessageCrea
 
 def get_contact_messages(db: Session, skip: int = 0, limit: int = 100, 
                          read_status: Optional[bool] = None,
-                         responded_status: Optional[bool] = None):
+                         responded_status: Optional[bool] = None,
+                         summary: bool = False):
     query = db.query(models.ContactMessage)
     
+    if summary:
+        # Inbox-style listings skip the message body and notes; the full
+        # row is available through get_contact_message().
+        contact = models.ContactMessage
+        query = query.options(load_only(
+            contact.id, contact.name, contact.email, contact.event_type,
+            contact.is_read, contact.responded, contact.created_at
+        ))
+    
     if read_status is not None:
         query = query.filter(models.ContactMessage.is_read == read_status)
     
@@ -36,70 +71,26 @@ def get_contact_messages(db: Session, skip: int = 0, limit: int = 100,
     return query.order_by(desc(models.ContactMessage.created_at)).offset(skip).limit(limit).all()
 
 def get_contact_message(db: Session, message_id: int):
-    return db.query(models.ContactMessage).filter(models.ContactMessage.id == message_id).first()
+    return db.get(models.ContactMessage, message_id)
 
 def mark_as_read(db: Session, message_id: int):
-    message = get_contact_message(db, message_id)
-    if message:
-        message.is_read = True
-        db.commit()
-        db.refresh(message)
-    return message
+    return _update_returning(db, models.ContactMessage, message_id, {"is_read": True})
 
 def add_notes(db: Session, message_id: int, notes: str):
-    message = get_contact_message(db, message_id)
-    if message:
-        message.notes = notes
-        db.commit()
-        db.refresh(message)
-    return message
+    return _update_returning(db, models.ContactMessage, message_id, {"notes": notes})
 
 # Bookings CRUD
 def create_booking(db: Session, booking_data: schemas.BookingCreate):
+    # Schema fields map 1:1 onto Booking columns
+    data = booking_data.model_dump()
+    
     # Calculate balance
-    total_price = booking_data.total_price
-    balance_due = total_price - booking_data.discount
+    balance_due = data["total_price"] - data["discount"]
     
     db_booking = models.Booking(
-        # Client info
-        client_name=booking_data.client_name,
-        client_email=booking_data.client_email,
-        client_phone=booking_data.client_phone,
-        client_address=booking_data.client_address,
-        
-        # Event info
-        event_type=booking_data.event_type,
-        event_name=booking_data.event_name,
-        event_date=booking_data.event_date,
-        event_time=booking_data.event_time,
-        event_location=booking_data.event_location,
-        venue_type=booking_data.venue_type,
-        expected_guests=booking_data.expected_guests,
-        
-        # Service info
-        service_type=booking_data.service_type,
-        service_package=booking_data.service_package,
-        additional_services=booking_data.additional_services,
-        
-        # Pyrotechnics info
-        display_duration=booking_data.display_duration,
-        display_type=booking_data.display_type,
-        colors_requested=booking_data.colors_requested,
-        music_sync=booking_data.music_sync,
-        special_effects=booking_data.special_effects,
-        
-        # Pricing
-        base_price=booking_data.base_price,
-        additional_charges=booking_data.additional_charges,
-        discount=booking_data.discount,
-        total_price=total_price,
+        **data,
         balance_due=balance_due,
         
-        # Additional info
-        special_instructions=booking_data.special_instructions,
-        emergency_contact=booking_data.emergency_contact,
-        insurance_required=booking_data.insurance_required,
-        
         # Defaults
         booking_status=models.BookingStatus.PENDING,
         payment_status=models.PaymentStatus.PENDING,
@@ -112,71 +103,115 @@ def create_booking(db: Session, booking_data: schemas.BookingCreate):
     db.refresh(db_booking)
     return db_booking
 
-def get_bookings(db: Session, skip: int = 0, limit: int = 100,
-                 status: Optional[str] = None,
-                 date_from: Optional[date] = None,
-                 date_to: Optional[date] = None):
-    query = db.query(models.Booking)
+def _booking_filters(status: Optional[str] = None,
+                     date_from: Optional[date] = None,
+                     date_to: Optional[date] = None) -> list:
+    filters = []
     
     if status:
-        query = query.filter(models.Booking.booking_status == status)
+        filters.append(models.Booking.booking_status == status)
     
     if date_from:
-        query = query.filter(models.Booking.event_date >= date_from)
+        filters.append(models.Booking.event_date >= date_from)
     
     if date_to:
-        query = query.filter(models.Booking.event_date <= date_to)
+        filters.append(models.Booking.event_date <= date_to)
     
-    return query.order_by(asc(models.Booking.event_date)).offset(skip).limit(limit).all()
+    return filters
+
+def _bookings_query(db: Session, status: Optional[str] = None,
+                    date_from: Optional[date] = None,
+                    date_to: Optional[date] = None):
+    query = db.query(models.Booking).filter(*_booking_filters(status, date_from, date_to))
+    return query.order_by(asc(models.Booking.event_date))
+
+def get_bookings(db: Session, skip: int = 0, limit: int = 100,
+                 status: Optional[str] = None,
+                 date_from: Optional[date] = None,
+                 date_to: Optional[date] = None):
+    query = _bookings_query(db, status, date_from, date_to)
+    return query.offset(skip).limit(limit).all()
+
+def iter_bookings(db: Session, status: Optional[str] = None,
+                  date_from: Optional[date] = None,
+                  date_to: Optional[date] = None,
+                  batch_size: int = 200) -> Iterator[models.Booking]:
+    """
+    Stream bookings matching the filters without building a full list.
+    
+    Rows are fetched in batches of ``batch_size`` (server-side cursor where
+    the driver supports it), so exports and other full scans keep memory
+    bounded by the batch rather than by the result set.
+    """
+    query = _bookings_query(db, status, date_from, date_to)
+    yield from query.yield_per(batch_size)
+
+# Columns read by the admin booking exports
+BOOKING_EXPORT_COLUMNS = (
+    "id", "client_name", "client_email", "client_phone",
+    "event_name", "event_type", "event_date", "event_time", "event_location",
+    "service_package", "display_duration",
+    "total_price", "deposit_paid", "balance_due",
+    "booking_status", "payment_status",
+    "created_at", "confirmed_at", "completed_at",
+    "special_instructions", "emergency_contact",
+)
+
+def iter_booking_export_rows(db: Session, status: Optional[str] = None,
+                             date_from: Optional[date] = None,
+                             date_to: Optional[date] = None,
+                             batch_size: int = 1000) -> Iterator[Any]:
+    """
+    Stream the export columns of matching bookings as plain result rows.
+    
+    Unlike iter_bookings() no ORM instances are built: each row is a named
+    tuple carrying only BOOKING_EXPORT_COLUMNS (attribute names match the
+    model's), fetched ``batch_size`` at a time.
+    """
+    booking = models.Booking
+    stmt = (
+        select(*(getattr(booking, name) for name in BOOKING_EXPORT_COLUMNS))
+        .where(*_booking_filters(status, date_from, date_to))
+        .order_by(asc(booking.event_date))
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.execute(stmt)
 
 def get_booking(db: Session, booking_id: int):
-    return db.query(models.Booking).filter(models.Booking.id == booking_id).first()
+    return db.get(models.Booking, booking_id)
 
 def update_booking_status(db: Session, booking_id: int, status: str):
-    booking = get_booking(db, booking_id)
-    if booking:
-        booking.booking_status = status
-        
-        if status == "confirmed":
-            booking.confirmed_at = datetime.now()
-        elif status == "completed":
-            booking.completed_at = datetime.now()
-        
-        db.commit()
-        db.refresh(booking)
-    return booking
+    values = {"booking_status": status}
+    
+    if status == "confirmed":
+        values["confirmed_at"] = datetime.now()
+    elif status == "completed":
+        values["completed_at"] = datetime.now()
+    
+    return _update_returning(db, models.Booking, booking_id, values)
 
 def update_payment(db: Session, booking_id: int, amount: float):
-    booking = get_booking(db, booking_id)
-    if booking:
-        booking.deposit_paid += amount
-        booking.balance_due = max(0, booking.total_price - booking.deposit_paid)
-        
-        if booking.balance_due == 0:
-            booking.payment_status = models.PaymentStatus.PAID
-        elif booking.deposit_paid > 0:
-            booking.payment_status = models.PaymentStatus.PARTIAL
-        
-        db.commit()
-        db.refresh(booking)
-    return booking
+    # Everything is derived from the row's current values inside a single
+    # UPDATE, so concurrent payments cannot overwrite each other's deposit.
+    # (SET expressions all see the pre-update row.)
+    booking = models.Booking
+    deposit_paid = booking.deposit_paid + amount
+    remaining = booking.total_price - deposit_paid
+    status_type = booking.payment_status.type
+    
+    return _update_returning(db, booking, booking_id, {
+        "deposit_paid": deposit_paid,
+        "balance_due": case((remaining > 0, remaining), else_=0.0),
+        "payment_status": case(
+            (remaining <= 0, literal(models.PaymentStatus.PAID, status_type)),
+            (deposit_paid > 0, literal(models.PaymentStatus.PARTIAL, status_type)),
+            else_=booking.payment_status
+        ),
+    })
 
 # Services CRUD
 def create_service(db: Session, service_data: schemas.ServiceCreate):
-    db_service = models.Service(
-        name=service_data.name,
-        slug=service_data.slug,
-        category=service_data.category,
-        description=service_data.description,
-        features=service_data.features,
-        base_price=service_data.base_price,
-        price_range_min=service_data.price_range_min,
-        price_range_max=service_data.price_range_max,
-        duration=service_data.duration,
-        is_popular=service_data.is_popular,
-        display_order=service_data.display_order,
-        is_active=True
-    )
+    db_service = models.Service(**service_data.model_dump(), is_active=True)
     db.add(db_service)
     db.commit()
     db.refresh(db_service)
@@ -186,7 +221,16 @@ def get_services(db: Session, skip: int = 0, limit: int = 100,
                  category: Optional[str] = None,
                  popular_only: bool = False,
                  active_only: bool = True):
-    query = db.query(models.Service)
+    # Only the columns ServiceResponse serialises; image_url, disclaimer and
+    # the guest limits are left out of list payloads.
+    service = models.Service
+    query = db.query(service).options(load_only(
+        service.id, service.name, service.slug, service.category,
+        service.description, service.features, service.base_price,
+        service.price_range_min, service.price_range_max, service.duration,
+        service.is_popular, service.is_active, service.display_order,
+        service.created_at, service.updated_at
+    ))
     
     if category:
         query = query.filter(models.Service.category == category)
@@ -200,7 +244,7 @@ def get_services(db: Session, skip: int = 0, limit: int = 100,
     return query.order_by(asc(models.Service.display_order)).offset(skip).limit(limit).all()
 
 def get_service(db: Session, service_id: int):
-    return db.query(models.Service).filter(models.Service.id == service_id).first()
+    return db.get(models.Service, service_id)
 
 def get_service_by_slug(db: Session, slug: str):
     return db.query(models.Service).filter(models.Service.slug == slug).first()
@@ -208,11 +252,7 @@ def get_service_by_slug(db: Session, slug: str):
 # Testimonials CRUD
 def create_testimonial(db: Session, testimonial_data: schemas.TestimonialCreate):
     db_testimonial = models.Testimonial(
-        client_name=testimonial_data.client_name,
-        event_type=testimonial_data.event_type,
-        event_date=testimonial_data.event_date,
-        rating=testimonial_data.rating,
-        testimonial=testimonial_data.testimonial,
+        **testimonial_data.model_dump(),
         is_approved=False  # New testimonials need approval
     )
     db.add(db_testimonial)
@@ -233,8 +273,59 @@ def get_testimonials(db: Session, skip: int = 0, limit: int = 100,
     
     return query.order_by(desc(models.Testimonial.created_at)).offset(skip).limit(limit).all()
 
+def approve_testimonials(db: Session, testimonial_ids: List[int], featured: bool = False) -> int:
+    """Approve many testimonials with one UPDATE; returns the number of rows changed."""
+    if not testimonial_ids:
+        return 0
+    
+    values = {"is_approved": True}
+    if featured:
+        values["is_featured"] = True
+    
+    updated = db.query(models.Testimonial).filter(
+        models.Testimonial.id.in_(testimonial_ids)
+    ).update(values, synchronize_session=False)
+    db.commit()
+    return updated
+
 # Newsletter CRUD
 def subscribe_newsletter(db: Session, email: str, name: Optional[str] = None, source: str = "website"):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert = pg_insert
+    elif dialect == "sqlite":
+        insert = sqlite_insert
+    else:
+        return _subscribe_newsletter_select_first(db, email, name, source)
+    
+    # Single-statement upsert: inserts a new subscriber, or reactivates an
+    # existing one (resetting subscribed_at only if it had unsubscribed).
+    # Closes the window where two concurrent subscribes both saw no row.
+    subscriber = models.NewsletterSubscriber
+    stmt = insert(subscriber).values(
+        email=email.lower().strip(),  # Core insert bypasses @validates
+        name=name,
+        source=source,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[subscriber.email],
+        set_={
+            "is_active": True,
+            "subscribed_at": case(
+                (subscriber.is_active == True, subscriber.subscribed_at),
+                else_=datetime.now()
+            ),
+        },
+    ).returning(subscriber)
+    
+    db_subscriber = db.execute(
+        stmt, execution_options={"populate_existing": True}
+    ).scalar_one()
+    db.commit()
+    return db_subscriber
+
+def _subscribe_newsletter_select_first(db: Session, email: str, name: Optional[str], source: str):
+    """Fallback for databases without INSERT ... ON CONFLICT support."""
     # Check if already subscribed
     existing = db.query(models.NewsletterSubscriber).filter(
         models.NewsletterSubscriber.email == email
@@ -270,40 +361,278 @@ def unsubscribe_newsletter(db: Session, email: str):
     
     return subscriber
 
+def bulk_create_subscribers(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """
+    Import many newsletter subscribers with a single multi-row INSERT.
+    
+    Each row needs an ``email`` and may carry ``name`` and ``source``.
+    Emails are normalised here because ``@validates`` does not run for bulk
+    mappings; addresses already on the list (or repeated within ``rows``)
+    are skipped. Returns the number of subscribers inserted.
+    """
+    subscriber = models.NewsletterSubscriber
+    mappings = {}
+    for row in rows:
+        email = row["email"].strip().lower()
+        if '@' not in email:
+            raise ValueError(f"Invalid email address: {row['email']}")
+        mappings.setdefault(email, {
+            "email": email,
+            "name": row.get("name"),
+            "source": row.get("source", "website"),
+        })
+    
+    if not mappings:
+        return 0
+    
+    existing = {
+        email for (email,) in
+        db.query(subscriber.email).filter(subscriber.email.in_(list(mappings)))
+    }
+    new_rows = [m for email, m in mappings.items() if email not in existing]
+    
+    if new_rows:
+        db.bulk_insert_mappings(subscriber, new_rows)
+        db.commit()
+    return len(new_rows)
+
 # Stats
 def get_stats(db: Session):
-    total_bookings = db.query(models.Booking).count()
-    pending_bookings = db.query(models.Booking).filter(
-        models.Booking.booking_status == "pending"
-    ).count()
-    completed_events = db.query(models.Booking).filter(
-        models.Booking.booking_status == "completed"
-    ).count()
-    
-    # Calculate revenue from completed events
-    completed_bookings = db.query(models.Booking).filter(
-        models.Booking.booking_status == "completed"
-    ).all()
-    total_revenue = sum(booking.total_price for booking in completed_bookings)
-    
-    services_count = db.query(models.Service).filter(
+    # Booking counts and completed revenue are computed with conditional
+    # aggregates, and the remaining counts ride along as scalar subqueries,
+    # so the whole dashboard summary is a single round trip. SUM() over an
+    # empty table is NULL, hence the COALESCE to keep the response typed.
+    booking = models.Booking
+    services_count = db.query(func.count(models.Service.id)).filter(
         models.Service.is_active == True
-    ).count()
-    
-    testimonials_count = db.query(models.Testimonial).filter(
+    ).scalar_subquery()
+    testimonials_count = db.query(func.count(models.Testimonial.id)).filter(
         models.Testimonial.is_approved == True
-    ).count()
-    
-    newsletter_subscribers = db.query(models.NewsletterSubscriber).filter(
+    ).scalar_subquery()
+    newsletter_subscribers = db.query(func.count(models.NewsletterSubscriber.id)).filter(
         models.NewsletterSubscriber.is_active == True
-    ).count()
+    ).scalar_subquery()
+    
+    row = db.query(
+        func.count(booking.id),
+        func.coalesce(func.sum(case((booking.booking_status == models.BookingStatus.PENDING, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((booking.booking_status == models.BookingStatus.COMPLETED, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((booking.booking_status == models.BookingStatus.COMPLETED, booking.total_price), else_=0.0)), 0.0),
+        services_count,
+        testimonials_count,
+        newsletter_subscribers
+    ).one()
     
     return {
-        "total_bookings": total_bookings,
-        "pending_bookings": pending_bookings,
-        "completed_events": completed_events,
-        "total_revenue": total_revenue,
-        "services_count": services_count,
-        "testimonials_count": testimonials_count,
-        "newsletter_subscribers": newsletter_subscribers
-    }
\ No newline at end of file
+        "total_bookings": row[0],
+        "pending_bookings": row[1],
+        "completed_events": row[2],
+        "total_revenue": row[3],
+        "services_count": row[4],
+        "testimonials_count": row[5],
+        "newsletter_subscribers": row[6]
+    }
+
+
+# Admin dashboard aggregates
+#
+# Each helper is one SELECT of FILTERed aggregates, so the dashboard reads
+# a handful of scalars instead of loading every row into Python. With
+# STATS_ROLLUPS_ENABLED on PostgreSQL, bookings and contacts are read from
+# the daily materialized views in stats_rollups.sql instead.
+def _use_stats_rollups(db: Session) -> bool:
+    return (
+        get_settings().STATS_ROLLUPS_ENABLED
+        and db.get_bind().dialect.name == "postgresql"
+    )
+
+def refresh_stats_rollups(db: Session) -> None:
+    """Rebuild the dashboard rollup views without blocking readers."""
+    db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY booking_stats_daily"))
+    db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY contact_stats_daily"))
+    db.commit()
+
+def _rollup_booking_stats(db: Session, date_from: date, date_to: date) -> Dict[str, Any]:
+    rollup = table(
+        "booking_stats_daily",
+        column("day"), column("created_day"), column("booking_status"),
+        column("bookings"), column("revenue"),
+    )
+    rows = db.query(
+        rollup.c.booking_status,
+        func.sum(rollup.c.bookings),
+        func.sum(rollup.c.revenue),
+        func.coalesce(func.sum(rollup.c.bookings).filter(rollup.c.created_day >= date_from), 0),
+    ).filter(
+        rollup.c.day >= date_from, rollup.c.day <= date_to
+    ).group_by(rollup.c.booking_status).all()
+    
+    status_counts = dict.fromkeys((s.value for s in models.BookingStatus), 0)
+    revenue = dict.fromkeys(status_counts, 0.0)
+    created_in_range = 0
+    for booking_status, count, status_revenue, created in rows:
+        status_counts[booking_status] = int(count)
+        revenue[booking_status] = float(status_revenue)
+        created_in_range += int(created)
+    
+    completed = status_counts["completed"]
+    return {
+        "total": sum(status_counts.values()),
+        "total_revenue": revenue["completed"],
+        "pending_revenue": revenue["pending"] + revenue["confirmed"],
+        "avg_booking_value": revenue["completed"] / completed if completed else 0.0,
+        "upcoming": status_counts["confirmed"] + status_counts["in_progress"],
+        "created_in_range": created_in_range,
+        "status_counts": status_counts,
+    }
+
+def _rollup_contact_stats(db: Session, date_from: date, date_to: date) -> Dict[str, int]:
+    rollup = table(
+        "contact_stats_daily",
+        column("day"), column("total"), column("unread"), column("responded"),
+    )
+    row = db.query(
+        func.coalesce(func.sum(rollup.c.total), 0),
+        func.coalesce(func.sum(rollup.c.unread), 0),
+        func.coalesce(func.sum(rollup.c.responded), 0),
+    ).filter(rollup.c.day >= date_from, rollup.c.day <= date_to).one()
+    return {"total": int(row[0]), "unread": int(row[1]), "responded": int(row[2])}
+
+def aggregate_booking_stats(db: Session, date_from: date, date_to: date) -> Dict[str, Any]:
+    """Revenue and status counts for bookings whose event falls in the range."""
+    if _use_stats_rollups(db):
+        return _rollup_booking_stats(db, date_from, date_to)
+    
+    booking = models.Booking
+    status_col = booking.booking_status
+    completed = status_col == models.BookingStatus.COMPLETED
+    in_range = (booking.event_date >= date_from, booking.event_date <= date_to)
+    
+    row = db.query(
+        func.count(),
+        func.coalesce(func.sum(booking.total_price).filter(completed), 0.0),
+        func.coalesce(func.sum(booking.total_price).filter(
+            status_col.in_([models.BookingStatus.PENDING, models.BookingStatus.CONFIRMED])
+        ), 0.0),
+        func.coalesce(func.avg(booking.total_price).filter(completed), 0.0),
+        func.count().filter(
+            status_col.in_([models.BookingStatus.CONFIRMED, models.BookingStatus.IN_PROGRESS])
+        ),
+        func.count().filter(booking.created_at >= date_from),
+    ).filter(*in_range).one()
+    
+    status_counts = dict.fromkeys((s.value for s in models.BookingStatus), 0)
+    for booking_status, count in (
+        db.query(status_col, func.count()).filter(*in_range).group_by(status_col)
+    ):
+        status_counts[booking_status.value] = count
+    
+    return {
+        "total": row[0],
+        "total_revenue": row[1],
+        "pending_revenue": row[2],
+        "avg_booking_value": row[3],
+        "upcoming": row[4],
+        "created_in_range": row[5],
+        "status_counts": status_counts,
+    }
+
+def aggregate_contact_stats(db: Session, date_from: date, date_to: date) -> Dict[str, int]:
+    """Message counts for contacts received in the range (inclusive of ``date_to``)."""
+    if _use_stats_rollups(db):
+        return _rollup_contact_stats(db, date_from, date_to)
+    
+    contact = models.ContactMessage
+    row = db.query(
+        func.count(),
+        func.count().filter(contact.is_read == False),
+        func.count().filter(contact.responded == True),
+    ).filter(
+        contact.created_at >= date_from,
+        contact.created_at < date_to + timedelta(days=1),
+    ).one()
+    return {"total": row[0], "unread": row[1], "responded": row[2]}
+
+def aggregate_service_stats(db: Session) -> Dict[str, int]:
+    service = models.Service
+    row = db.query(
+        func.count(),
+        func.count().filter(service.is_active == True),
+        func.count().filter(service.is_popular == True),
+    ).select_from(service).one()
+    return {"total": row[0], "active": row[1], "popular": row[2]}
+
+def aggregate_testimonial_stats(db: Session) -> Dict[str, int]:
+    testimonial = models.Testimonial
+    row = db.query(
+        func.count(),
+        func.count().filter(testimonial.is_approved == True),
+        func.count().filter(testimonial.is_featured == True),
+    ).select_from(testimonial).one()
+    return {
+        "total": row[0],
+        "approved": row[1],
+        "pending": row[0] - row[1],
+        "featured": row[2],
+    }
+
+def aggregate_subscriber_stats(db: Session) -> Dict[str, int]:
+    subscriber = models.NewsletterSubscriber
+    row = db.query(
+        func.count(),
+        func.count().filter(subscriber.is_active == True),
+    ).select_from(subscriber).one()
+    return {"total": row[0], "active": row[1]}
+
+
+# Admin reports
+def _period_bucket(db: Session, column, group_by: str):
+    """
+    SQL expression truncating ``column`` to the start of its day/week/month.
+    
+    date_trunc on PostgreSQL; SQLite (the dev database) has no date_trunc,
+    so the same buckets are built with its date functions instead.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(group_by, column)
+    if group_by == "week":
+        return func.date(column, "weekday 0", "-6 days")  # Monday, as date_trunc
+    if group_by == "month":
+        return func.strftime("%Y-%m-01", column)
+    return func.date(column)
+
+def aggregate_bookings_by_period(db: Session, date_from: date, date_to: date,
+                                 group_by: str) -> List[Any]:
+    """
+    Booking counts and revenue per (period, status) for bookings created
+    in the range, ordered by period. One GROUP BY; the rows returned scale
+    with the number of buckets, not bookings.
+    """
+    booking = models.Booking
+    bucket = _period_bucket(db, booking.created_at, group_by).label("bucket")
+    return db.query(
+        bucket,
+        booking.booking_status,
+        func.count(),
+        func.coalesce(func.sum(booking.total_price), 0.0),
+    ).filter(
+        booking.created_at >= date_from,
+        booking.created_at < date_to + timedelta(days=1),
+    ).group_by(bucket, booking.booking_status).order_by(bucket).all()
+
+def aggregate_bookings_by_service_type(db: Session, date_from: date, date_to: date) -> Dict[str, int]:
+    """Bookings created in the range, counted per service type."""
+    booking = models.Booking
+    return dict(db.query(booking.service_type, func.count()).filter(
+        booking.created_at >= date_from,
+        booking.created_at < date_to + timedelta(days=1),
+    ).group_by(booking.service_type).all())
+
+
+def __getattr__(name: str):
+    """Resolve ``schemas`` on first access (PEP 562) instead of at import."""
+    if name == "schemas":
+        from . import schemas
+        globals()["schemas"] = schemas
+        return schemas
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,21 +6,23 @@ This module handles database engine creation, session management,
 and connection pooling for optimal performance in production.
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.engine import Engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
-from typing import Generator
+from sqlalchemy.orm import DeclarativeBase, sessionmaker, Session
+from sqlalchemy.pool import QueuePool, StaticPool
+from typing import Any, Dict, Generator, Optional
 import logging
+import time
 
-from app.config import settings
+from app.config import get_settings
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Create declarative base for models
-Base = declarative_base()
+# Declarative base for models (SQLAlchemy 2.x class API)
+class Base(DeclarativeBase):
+    pass
+
 
 # Database engine configuration
 def create_db_engine() -> Engine:
@@ -33,23 +35,31 @@ def create_db_engine() -> Engine:
     Notes:
         - Uses QueuePool for connection pooling in production
         - Sets appropriate timeouts and pool recycling
+        - Pre-ping is only enabled for networked databases
+        - SQLite connections run in WAL mode (readers don't block the writer)
         - Enables SQL logging only in development
     """
+    settings = get_settings()
     engine_kwargs = {
         "echo": settings.DEBUG,  # Log SQL queries only in debug mode
-        "pool_pre_ping": True,   # Verify connections before using
-        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
     }
+    is_sqlite = settings.DATABASE_URL.startswith("sqlite")
     
-    if settings.DATABASE_URL.startswith("sqlite"):
-        # SQLite specific configuration
+    if is_sqlite:
+        # SQLite specific configuration. There is no network hop to verify,
+        # so pre-ping and recycling would only add a round trip per checkout.
         engine_kwargs.update({
             "connect_args": {"check_same_thread": False},
         })
+        if ":memory:" in settings.DATABASE_URL or settings.DATABASE_URL == "sqlite://":
+            # An in-memory database lives inside one connection; share it
+            engine_kwargs["poolclass"] = StaticPool
     else:
         # Production database (PostgreSQL/MySQL) configuration
         engine_kwargs.update({
             "poolclass": QueuePool,
+            "pool_pre_ping": True,   # Verify connections before using
+            "pool_recycle": settings.DATABASE_POOL_RECYCLE,
             "pool_size": settings.DATABASE_POOL_SIZE,
             "max_overflow": settings.DATABASE_MAX_OVERFLOW,
             "pool_timeout": 30,  # Wait 30 seconds for connection
@@ -60,6 +70,8 @@ def create_db_engine() -> Engine:
             settings.DATABASE_URL,
             **engine_kwargs
         )
+        if is_sqlite:
+            event.listen(engine, "connect", _set_sqlite_pragmas)
         logger.info(f"Database engine created successfully for {settings.DATABASE_URL}")
         return engine
     except Exception as e:
@@ -67,17 +79,58 @@ def create_db_engine() -> Engine:
         raise
 
 
-# Create engine instance
-engine = create_db_engine()
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Enable WAL journaling and foreign keys on each new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+# Engine and session factories are created on first use rather than at
+# import, so importing this module (CLI --help, test collection) never
+# builds a connection pool or touches the database file.
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+
+
+def get_engine() -> Engine:
+    """Return the process-wide engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_db_engine()
+    return _engine
+
+
+def get_session_factory() -> sessionmaker:
+    """Return the session factory bound to the engine, creating it on first use."""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=get_engine(),
+            expire_on_commit=False,  # Keep objects available after commit
+            class_=Session
+        )
+    return _session_factory
+
+
+_LAZY_ATTRIBUTES = {
+    "engine": get_engine,
+    "session_factory": get_session_factory,
+    "SessionLocal": get_session_factory,
+}
 
-# Create session factory with appropriate configuration
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-    expire_on_commit=False,  # Keep objects available after commit
-    class_=Session
-)
+
+def __getattr__(name: str):
+    """Keep ``from app.database import engine, SessionLocal`` working (PEP 562)."""
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -94,9 +147,29 @@ def get_db() -> Generator[Session, None, None]:
             
     Notes:
         - Ensures session is properly closed after request completion
-        - Handles exceptions and rolls back transactions on error
+        - Does not commit: CRUD functions commit their own writes, so read
+          endpoints no longer pay for an empty COMMIT on every request
+        - Closing the session rolls back anything left uncommitted
+    """
+    db: Session = get_session_factory()()
+    try:
+        yield db
+    finally:
+        db.close()  # Always close session
+
+
+def get_db_transaction() -> Generator[Session, None, None]:
+    """
+    Dependency function for endpoints that own a multi-step transaction.
+    
+    Yields:
+        SQLAlchemy session that is committed once the endpoint returns.
+        
+    Notes:
+        - Rolls back the transaction on any exception
+        - Use instead of get_db when several writes must succeed together
     """
-    db: Session = SessionLocal()
+    db: Session = get_session_factory()()
     try:
         yield db
         db.commit()  # Commit transaction if no exceptions
@@ -108,6 +181,29 @@ def get_db() -> Generator[Session, None, None]:
         db.close()  # Always close session
 
 
+# Health probe results are reused for a short while, so /health and
+# /admin/system/health polled every few seconds don't each hit the database
+_PROBE_TTL = 5.0
+_PROBE_STMT = text("SELECT 1")
+_probe_cache: Dict[str, Any] = {"error": None, "ts": float("-inf")}
+
+
+def probe_database() -> Optional[str]:
+    """Run ``SELECT 1``; return the error message, or None if the database answered."""
+    now = time.monotonic()
+    if now - _probe_cache["ts"] < _PROBE_TTL:
+        return _probe_cache["error"]
+    
+    error = None
+    try:
+        with get_session_factory()() as db:
+            db.execute(_PROBE_STMT).scalar()
+    except Exception as e:
+        error = str(e)
+    _probe_cache.update(error=error, ts=now)
+    return error
+
+
 def init_db() -> None:
     """
     Initialize database by creating all tables.
@@ -120,8 +216,8 @@ def init_db() -> None:
         - Use Alembic migrations for production schema changes
     """
     try:
-        logger.info(f"Initializing database: {settings.DATABASE_URL}")
-        Base.metadata.create_all(bind=engine)
+        logger.info(f"Initializing database: {get_settings().DATABASE_URL}")
+        Base.metadata.create_all(bind=get_engine())
         logger.info("✅ Database tables created successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
@@ -134,8 +230,12 @@ def close_db() -> None:
     
     Should be called during application shutdown.
     """
+    global _engine, _session_factory
+    if _engine is None:
+        return  # Nothing was ever connected
     try:
-        engine.dispose()
+        _engine.dispose()
+        _engine = _session_factory = None
         logger.info("Database connections closed successfully")
     except Exception as e:
         logger.error(f"Error closing database connections: {e}")
\ No newline at end of file
@@ -1,14 +1,226 @@
 # app/email_service.py
+import html
+import logging
+import queue
+import re
 import smtplib
+import ssl
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-from typing import List, Optional
-import os
-from jinja2 import Template
+from contextlib import contextmanager
+from datetime import date
+from typing import Iterator, List, Tuple
+from jinja2 import DictLoader, Environment
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+# HTML template for booking confirmation
+BOOKING_CONFIRMATION_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background: linear-gradient(135deg, #FF6B00 0%, #FFD700 100%); 
+                 color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0; }
+        .content { background: #f9f9f9; padding: 20px; border-radius: 0 0 10px 10px; }
+        .booking-details { background: white; padding: 15px; border-radius: 5px; margin: 15px 0; }
+        .footer { text-align: center; margin-top: 20px; color: #666; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🎆 IGNUX Booking Confirmation</h1>
+            <p>Your fireworks experience is being prepared!</p>
+        </div>
+        <div class="content">
+            <p>Dear {{ client_name }},</p>
+            <p>Thank you for booking IGNUX for your {{ event_type }}. Here are your booking details:</p>
+
+            <div class="booking-details">
+                <h3>📋 Booking Details</h3>
+                <p><strong>Event:</strong> {{ event_name }}</p>
+                <p><strong>Date:</strong> {{ event_date }} at {{ event_time }}</p>
+                <p><strong>Location:</strong> {{ event_location }}</p>
+                <p><strong>Service Package:</strong> {{ service_package }}</p>
+                <p><strong>Duration:</strong> {{ display_duration }}</p>
+
+                <h3>💰 Payment Information</h3>
+                <p><strong>Total Amount:</strong> KES {{ total_price }}</p>
+                <p><strong>Deposit Due:</strong> KES {{ deposit_amount }}</p>
+                <p><strong>Booking Status:</strong> {{ booking_status }}</p>
+            </div>
+
+            <p><strong>Next Steps:</strong></p>
+            <ol>
+                <li>Our team will contact you within 24 hours for site assessment</li>
+                <li>Please confirm the deposit payment to secure your date</li>
+                <li>We'll send you the safety and permit documentation</li>
+            </ol>
+
+            <p>For any questions, contact us at:</p>
+            <ul>
+                <li>📞 Phone: +254 750 077 424</li>
+                <li>📧 Email: info@ignux.com</li>
+                <li>💬 WhatsApp: https://wa.me/254750077424</li>
+            </ul>
+
+            <p>Best regards,<br>The IGNUX Team</p>
+        </div>
+        <div class="footer">
+            <p>IGNUX - Igniting Unforgettable Experiences</p>
+            <p>© {{ current_year }} IGNUX. All rights reserved.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# HTML template for contact form confirmation
+CONTACT_CONFIRMATION_TEMPLATE = """
+<html>
+<body style="font-family: Arial, sans-serif; line-height: 1.6;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+        <div style="background: linear-gradient(135deg, #FF6B00 0%, #FFD700 100%); 
+                   color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
+            <h1>🎆 Thank You for Contacting IGNUX!</h1>
+        </div>
+        <div style="background: #f9f9f9; padding: 20px; border-radius: 0 0 10px 10px;">
+            <p>Dear {{ name }},</p>
+            <p>We've received your inquiry about our {{ event_type }} services and will get back to you within 24 hours.</p>
+
+            <div style="background: white; padding: 15px; border-radius: 5px; margin: 15px 0;">
+                <h3>📝 Your Inquiry Summary:</h3>
+                <p><strong>Event Type:</strong> {{ event_type }}</p>
+                <p><strong>Event Date:</strong> {{ event_date }}</p>
+                <p><strong>Budget:</strong> {{ budget }}</p>
+            </div>
+
+            <p>For immediate assistance, you can:</p>
+            <ul>
+                <li>📞 Call us: +254 750 077 424</li>
+                <li>💬 WhatsApp: <a href="https://wa.me/254750077424">Click to chat</a></li>
+            </ul>
+
+            <p>Best regards,<br>The IGNUX Team</p>
+        </div>
+        <div style="text-align: center; margin-top: 20px; color: #666; font-size: 12px;">
+            <p>IGNUX - Igniting Unforgettable Experiences</p>
+            <p>© {{ current_year }} IGNUX. All rights reserved.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# Jinja templates are parsed and compiled once at import; each send only renders
+_jinja_env = Environment(
+    loader=DictLoader({
+        "booking_confirmation": BOOKING_CONFIRMATION_TEMPLATE,
+    }),
+    autoescape=True,
+    auto_reload=False,
+)
+_BOOKING_TEMPLATE = _jinja_env.get_template("booking_confirmation")
+
+# The contact confirmation only fills a few plain fields, so it skips Jinja:
+# the template is split once into constant text and field names, and each
+# send just escapes the fields and joins the pieces
+_CONTACT_PARTS = tuple(re.split(r"\{\{ (\w+) \}\}", CONTACT_CONFIRMATION_TEMPLATE))
+
+
+def _render_contact_confirmation(fields: dict) -> str:
+    """Fill the contact confirmation template with HTML-escaped field values."""
+    return "".join([
+        part if i % 2 == 0 else html.escape(str(fields[part]))
+        for i, part in enumerate(_CONTACT_PARTS)
+    ])
+
+
+# Share of the total price due as a deposit to secure a booking
+DEPOSIT_RATE = 0.3
+
+
+def deposit_for(total_price: float) -> float:
+    """Deposit due for a booking of ``total_price``, rounded to cents."""
+    return round(total_price * DEPOSIT_RATE, 2)
+
+
+# Admin notification (subject, body) formats, keyed by notification type
+_ADMIN_NOTIFICATION_FORMATS = {
+    "new_booking": (
+        "📋 New Booking - {event_name}",
+        """
+            New booking received:
+            
+            Client: {client_name}
+            Event: {event_name} ({event_type})
+            Date: {event_date}
+            Amount: KES {total_price}
+            Phone: {client_phone}
+            Email: {client_email}
+            
+            Please review in the admin panel.
+            """,
+    ),
+    "new_contact": (
+        "📧 New Contact Form - {name}",
+        """
+            New contact form submission:
+            
+            Name: {name}
+            Email: {email}
+            Phone: {phone}
+            Event Type: {event_type}
+            Message: {message:.200}...
+            
+            Please respond within 24 hours.
+            """,
+    ),
+}
+
+
+class _MissingAsNone(dict):
+    """format_map mapping that renders absent fields as None, like dict.get."""
+    
+    def __missing__(self, key):
+        return None
+
+
+# One TLS context for every SMTP connection: the CA bundle is loaded once
+# instead of on each reconnect, and the context keeps TLS 1.3 tickets
+_SSL_CONTEXT = ssl.create_default_context()
+
+# Port for SMTP over implicit TLS (SMTPS), which skips the STARTTLS exchange
+SMTPS_PORT = 465
+
+
+class _PooledSMTP:
+    """An authenticated SMTP connection plus the number of messages sent on it."""
+    
+    __slots__ = ("server", "sent")
+    
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.sent = 0
+    
+    def is_alive(self) -> bool:
+        """Cheap NOOP keepalive; False if the server has dropped us."""
+        try:
+            return self.server.noop()[0] == 250
+        except OSError:  # SMTPException and socket errors alike
+            return False
+    
+    def close(self) -> None:
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+
+
 class EmailService:
     def __init__(self):
         self.smtp_server = settings.SMTP_SERVER
@@ -16,100 +228,155 @@ class EmailService:
         self.smtp_username = settings.SMTP_USERNAME
         self.smtp_password = settings.SMTP_PASSWORD
         self.email_from = settings.EMAIL_FROM
+        self.max_messages_per_connection = settings.SMTP_MAX_MESSAGES_PER_CONNECTION
+        # Idle connections that have already done STARTTLS + LOGIN
+        self._pool: "queue.LifoQueue[_PooledSMTP]" = queue.LifoQueue(maxsize=settings.SMTP_POOL_SIZE)
+    
+    def _connect(self) -> _PooledSMTP:
+        """Open a new SMTP connection and authenticate it."""
+        if self.smtp_port == SMTPS_PORT:
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=_SSL_CONTEXT)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        try:
+            if not isinstance(server, smtplib.SMTP_SSL):
+                server.starttls(context=_SSL_CONTEXT)
+            server.login(self.smtp_username, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return _PooledSMTP(server)
+    
+    def _checkout(self) -> _PooledSMTP:
+        """Take a live idle connection from the pool, or open a new one."""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if conn.is_alive():
+                return conn
+            conn.close()
+    
+    def _checkin(self, conn: _PooledSMTP) -> None:
+        """Return a connection to the pool, recycling it once it has done its share."""
+        if conn.sent >= self.max_messages_per_connection:
+            conn.close()
+            return
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    @contextmanager
+    def _connection(self) -> Iterator[_PooledSMTP]:
+        """Borrow a pooled connection; broken connections are closed, not returned."""
+        conn = self._checkout()
+        try:
+            yield conn
+        except Exception:
+            conn.close()
+            raise
+        self._checkin(conn)
+    
+    def check_connection(self, timeout: float = 5.0) -> bool:
+        """
+        Check that the SMTP server is reachable with a single NOOP.
+        
+        Uses an idle pooled connection when there is one; otherwise opens a
+        bare connection without STARTTLS or LOGIN, so health probes don't
+        spend TLS handshakes or auth attempts against the provider.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = None
+        if conn is not None:
+            if conn.is_alive():
+                self._checkin(conn)
+                return True
+            conn.close()
+        try:
+            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=timeout) as server:
+                return server.noop()[0] == 250
+        except OSError:
+            return False
+    
+    def close(self) -> None:
+        """Close every idle pooled connection."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+    
+    def _build_message(self, to_email: str, subject: str, body: str, is_html: bool = False) -> MIMEText:
+        # A single body part needs no multipart/mixed wrapper
+        msg = MIMEText(body, 'html' if is_html else 'plain', 'utf-8')
+        msg['From'] = self.email_from
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        return msg
+    
+    def _deliver(self, messages: List[MIMEText]) -> None:
+        """Send messages back-to-back over one pooled connection."""
+        pending = list(messages)
+        try:
+            with self._connection() as conn:
+                while pending:
+                    conn.server.send_message(pending[0])
+                    conn.sent += 1
+                    pending.pop(0)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle connection between the NOOP and
+            # the send; retry what is left once on a fresh one
+            with self._connection() as conn:
+                for msg in pending:
+                    conn.server.send_message(msg)
+                    conn.sent += 1
     
     def send_email(self, to_email: str, subject: str, body: str, is_html: bool = False):
         """Send basic email"""
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.email_from
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            if is_html:
-                msg.attach(MIMEText(body, 'html'))
-            else:
-                msg.attach(MIMEText(body, 'plain'))
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
-            
+            self._deliver([self._build_message(to_email, subject, body, is_html)])
+            return True
+        except (smtplib.SMTPException, OSError):
+            logger.exception("SMTP send failed to %s", to_email)
+            return False
+    
+    def send_batch(self, messages: List[Tuple[str, str, str, bool]]):
+        """
+        Send several emails over a single SMTP connection.
+        
+        ``messages`` holds ``(to_email, subject, body, is_html)`` tuples. Use
+        this for notifications that go out together (e.g. client confirmation
+        plus admin notice) so they share one checkout instead of one each.
+        """
+        try:
+            self._deliver([self._build_message(*message) for message in messages])
             return True
-        except Exception as e:
-            print(f"Email sending failed: {e}")
+        except (smtplib.SMTPException, OSError):
+            logger.exception("SMTP batch send of %d messages failed", len(messages))
             return False
     
+    async def send_email_async(self, to_email: str, subject: str, body: str, is_html: bool = False):
+        """
+        Send basic email without blocking the event loop.
+        
+        The SMTP exchange runs on the threadpool over the shared connection
+        pool, so async route helpers and background tasks can await it.
+        """
+        return await run_in_threadpool(self.send_email, to_email, subject, body, is_html)
+    
+    async def send_batch_async(self, messages: List[Tuple[str, str, str, bool]]):
+        """Awaitable send_batch, run on the threadpool like send_email_async."""
+        return await run_in_threadpool(self.send_batch, messages)
+    
     def send_booking_confirmation(self, booking_data: dict):
         """Send booking confirmation email to client"""
         subject = f"IGNUX - Booking Confirmation #{booking_data.get('id', 'NEW')}"
         
-        # HTML template for booking confirmation
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-                .header { background: linear-gradient(135deg, #FF6B00 0%, #FFD700 100%); 
-                         color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0; }
-                .content { background: #f9f9f9; padding: 20px; border-radius: 0 0 10px 10px; }
-                .booking-details { background: white; padding: 15px; border-radius: 5px; margin: 15px 0; }
-                .footer { text-align: center; margin-top: 20px; color: #666; font-size: 12px; }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🎆 IGNUX Booking Confirmation</h1>
-                    <p>Your fireworks experience is being prepared!</p>
-                </div>
-                <div class="content">
-                    <p>Dear {{ client_name }},</p>
-                    <p>Thank you for booking IGNUX for your {{ event_type }}. Here are your booking details:</p>
-                    
-                    <div class="booking-details">
-                        <h3>📋 Booking Details</h3>
-                        <p><strong>Event:</strong> {{ event_name }}</p>
-                        <p><strong>Date:</strong> {{ event_date }} at {{ event_time }}</p>
-                        <p><strong>Location:</strong> {{ event_location }}</p>
-                        <p><strong>Service Package:</strong> {{ service_package }}</p>
-                        <p><strong>Duration:</strong> {{ display_duration }}</p>
-                        
-                        <h3>💰 Payment Information</h3>
-                        <p><strong>Total Amount:</strong> KES {{ total_price }}</p>
-                        <p><strong>Deposit Due:</strong> KES {{ deposit_amount }}</p>
-                        <p><strong>Booking Status:</strong> {{ booking_status }}</p>
-                    </div>
-                    
-                    <p><strong>Next Steps:</strong></p>
-                    <ol>
-                        <li>Our team will contact you within 24 hours for site assessment</li>
-                        <li>Please confirm the deposit payment to secure your date</li>
-                        <li>We'll send you the safety and permit documentation</li>
-                    </ol>
-                    
-                    <p>For any questions, contact us at:</p>
-                    <ul>
-                        <li>📞 Phone: +254 750 077 424</li>
-                        <li>📧 Email: info@ignux.com</li>
-                        <li>💬 WhatsApp: https://wa.me/254750077424</li>
-                    </ul>
-                    
-                    <p>Best regards,<br>The IGNUX Team</p>
-                </div>
-                <div class="footer">
-                    <p>IGNUX - Igniting Unforgettable Experiences</p>
-                    <p>© {{ current_year }} IGNUX. All rights reserved.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        template = Template(html_template)
-        html_body = template.render(
+        html_body = _BOOKING_TEMPLATE.render(
             client_name=booking_data.get('client_name'),
             event_type=booking_data.get('event_type'),
             event_name=booking_data.get('event_name'),
@@ -119,9 +386,9 @@ class EmailService:
             service_package=booking_data.get('service_package'),
             display_duration=booking_data.get('display_duration'),
             total_price=booking_data.get('total_price'),
-            deposit_amount=booking_data.get('total_price') * 0.3,  # 30% deposit
+            deposit_amount=booking_data.get('deposit_amount') or deposit_for(booking_data['total_price']),
             booking_status=booking_data.get('booking_status', 'pending'),
-            current_year=2024
+            current_year=date.today().year
         )
         
         return self.send_email(booking_data['client_email'], subject, html_body, is_html=True)
@@ -130,81 +397,25 @@ class EmailService:
         """Send confirmation email for contact form submission"""
         subject = "IGNUX - Thank You for Contacting Us"
         
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background: linear-gradient(135deg, #FF6B00 0%, #FFD700 100%); 
-                           color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
-                    <h1>🎆 Thank You for Contacting IGNUX!</h1>
-                </div>
-                <div style="background: #f9f9f9; padding: 20px; border-radius: 0 0 10px 10px;">
-                    <p>Dear {contact_data['name']},</p>
-                    <p>We've received your inquiry about our {contact_data['event_type']} services and will get back to you within 24 hours.</p>
-                    
-                    <div style="background: white; padding: 15px; border-radius: 5px; margin: 15px 0;">
-                        <h3>📝 Your Inquiry Summary:</h3>
-                        <p><strong>Event Type:</strong> {contact_data['event_type']}</p>
-                        <p><strong>Event Date:</strong> {contact_data.get('event_date', 'Not specified')}</p>
-                        <p><strong>Budget:</strong> {contact_data.get('budget', 'Not specified')}</p>
-                    </div>
-                    
-                    <p>For immediate assistance, you can:</p>
-                    <ul>
-                        <li>📞 Call us: +254 750 077 424</li>
-                        <li>💬 WhatsApp: <a href="https://wa.me/254750077424">Click to chat</a></li>
-                    </ul>
-                    
-                    <p>Best regards,<br>The IGNUX Team</p>
-                </div>
-                <div style="text-align: center; margin-top: 20px; color: #666; font-size: 12px;">
-                    <p>IGNUX - Igniting Unforgettable Experiences</p>
-                    <p>© 2024 IGNUX. All rights reserved.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        html_body = _render_contact_confirmation({
+            'name': contact_data['name'],
+            'event_type': contact_data['event_type'],
+            'event_date': contact_data.get('event_date', 'Not specified'),
+            'budget': contact_data.get('budget', 'Not specified'),
+            'current_year': date.today().year,
+        })
         
         return self.send_email(contact_data['email'], subject, html_body, is_html=True)
     
     def send_admin_notification(self, notification_type: str, data: dict):
         """Send notification to admin email"""
-        admin_email = settings.EMAIL_FROM
-        
-        if notification_type == "new_booking":
-            subject = f"📋 New Booking - {data.get('event_name')}"
-            body = f"""
-            New booking received:
-            
-            Client: {data.get('client_name')}
-            Event: {data.get('event_name')} ({data.get('event_type')})
-            Date: {data.get('event_date')}
-            Amount: KES {data.get('total_price')}
-            Phone: {data.get('client_phone')}
-            Email: {data.get('client_email')}
-            
-            Please review in the admin panel.
-            """
-        
-        elif notification_type == "new_contact":
-            subject = f"📧 New Contact Form - {data.get('name')}"
-            body = f"""
-            New contact form submission:
-            
-            Name: {data.get('name')}
-            Email: {data.get('email')}
-            Phone: {data.get('phone')}
-            Event Type: {data.get('event_type')}
-            Message: {data.get('message')[:200]}...
-            
-            Please respond within 24 hours.
-            """
-        
-        else:
+        formats = _ADMIN_NOTIFICATION_FORMATS.get(notification_type)
+        if formats is None:
             return False
         
-        return self.send_email(admin_email, subject, body)
+        subject_format, body_format = formats
+        fields = _MissingAsNone(data)
+        return self.send_email(settings.EMAIL_FROM, subject_format.format_map(fields), body_format.format_map(fields))
 
 # Initialize email service
 email_service = EmailService()
\ No newline at end of file
@@ -7,9 +7,16 @@ middleware, and routing for production deployment.
 """
 
 import logging
+import os
+import platform
+import re
+import secrets
+import sys
+import threading
 import time
 from contextlib import asynccontextmanager
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
@@ -18,14 +25,24 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from prometheus_fastapi_instrumentator import Instrumentator
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Scope
 import sentry_sdk
 
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # Brotli is optional; GZip alone is used without it
+    BrotliMiddleware = None
+
 from app.config import settings, is_production, get_cors_origins
-from app.database import init_db, close_db
+from app.database import init_db, close_db, probe_database
 from app.routes import bookings, contacts, services, admin
-from app.middleware import RateLimitMiddleware
+from app.middleware import (
+    RateLimitMiddleware,
+    RequestContextMiddleware,
+    rate_limit_kwargs,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -38,6 +55,112 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# SMTP probe results are reused for a short while, so load balancers
+# polling /health every few seconds don't each hit the mail server
+_EMAIL_HEALTH_TTL = 30.0
+_email_health_cache: Dict[str, Any] = {"status": None, "ts": 0.0}
+
+
+def _probe_email() -> bool:
+    """NOOP the SMTP server (no STARTTLS or LOGIN); True if it answered."""
+    now = time.time()
+    if now - _email_health_cache["ts"] < _EMAIL_HEALTH_TTL:
+        return _email_health_cache["status"]
+    
+    from app.email_service import email_service
+    
+    status = email_service.check_connection()
+    _email_health_cache.update(status=status, ts=now)
+    return status
+
+
+@lru_cache(maxsize=1)
+def _system_info() -> Dict[str, Any]:
+    """
+    Payload for ``/info``; fixed for the life of the process.
+    
+    Built on first request rather than at startup, because
+    platform.processor() may shell out to ``uname``.
+    """
+    return {
+        "system": {
+            "python_version": sys.version,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "application": {
+            "name": settings.PROJECT_NAME,
+            "version": settings.VERSION,
+            "environment": settings.ENVIRONMENT,
+            "debug": settings.DEBUG,
+        },
+        "company": {
+            "name": settings.COMPANY_NAME,
+            "brand": settings.BRAND_NAME,
+            "email": settings.COMPANY_EMAIL,
+            "phone": settings.COMPANY_PHONE,
+        },
+        "developer": {
+            "name": settings.DEVELOPER,
+            "url": settings.DEVELOPER_URL,
+        },
+    }
+
+
+# Fingerprinted asset names (app.3f9a2b1c.js, logo-9c1e04ab.png): the URL
+# changes whenever the content does, so they are safe to cache forever
+_HASHED_ASSET = re.compile(r"[.-][0-9a-fA-F]{8,}\.\w+$")
+_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_STATIC_LOOKUP_CACHE_SIZE = 1024
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that lets browsers and CDNs keep fingerprinted assets.
+    
+    Hashed assets get a one-year immutable Cache-Control, and their path
+    lookup (realpath + stat) is memoised. Other files are served exactly
+    as by StaticFiles, since their content can change under the same URL.
+    """
+    
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._hashed_lookups: Dict[str, Tuple[str, os.stat_result]] = {}
+    
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        if not _HASHED_ASSET.search(path):
+            return super().lookup_path(path)
+        
+        cached = self._hashed_lookups.get(path)
+        if cached is None:
+            full_path, stat_result = super().lookup_path(path)
+            if stat_result is None:
+                return full_path, stat_result
+            if len(self._hashed_lookups) >= _STATIC_LOOKUP_CACHE_SIZE:
+                self._hashed_lookups.clear()
+            cached = self._hashed_lookups[path] = (full_path, stat_result)
+        return cached
+    
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304) and _HASHED_ASSET.search(path):
+            response.headers["Cache-Control"] = _IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def _init_sentry() -> None:
+    """Initialize Sentry error tracking (run off the startup path)."""
+    try:
+        sentry_sdk.init(
+            dsn=settings.SENTRY_DSN,
+            traces_sample_rate=1.0,
+            environment=settings.ENVIRONMENT,
+            release=settings.VERSION,
+        )
+        logger.info("✅ Sentry monitoring initialized")
+    except Exception as e:
+        logger.error("Sentry initialization failed: %s", e)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -59,15 +182,10 @@ async def lifespan(app: FastAPI):
         init_db()
         logger.info("✅ Database initialized successfully")
         
-        # Initialize Sentry for error tracking in production
+        # Initialize Sentry for error tracking in production. It runs in a
+        # background thread so startup doesn't wait on it
         if settings.SENTRY_DSN:
-            sentry_sdk.init(
-                dsn=settings.SENTRY_DSN,
-                traces_sample_rate=1.0,
-                environment=settings.ENVIRONMENT,
-                release=settings.VERSION,
-            )
-            logger.info("✅ Sentry monitoring initialized")
+            threading.Thread(target=_init_sentry, name="sentry-init", daemon=True).start()
         
         startup_duration = time.time() - startup_time
         logger.info("✨ Startup completed in %.2f seconds", startup_duration)
@@ -83,6 +201,11 @@ async def lifespan(app: FastAPI):
         try:
             close_db()
             logger.info("✅ Database connections closed")
+            
+            # Only if something actually sent mail during this process
+            email_module = sys.modules.get("app.email_service")
+            if email_module is not None:
+                email_module.email_service.close()
         except Exception as e:
             logger.error("Error during shutdown: %s", e)
 
@@ -94,6 +217,9 @@ def create_application() -> FastAPI:
     Returns:
         Configured FastAPI application ready for deployment.
     """
+    # Resolved once; reused below and by the endpoint closures
+    production = is_production()
+    
     # Create FastAPI instance with metadata
     app = FastAPI(
         title=settings.PROJECT_NAME,
@@ -113,10 +239,11 @@ def create_application() -> FastAPI:
         ## Rate Limiting
         API is rate-limited to prevent abuse.
         """,
-        docs_url="/docs" if not is_production() else None,
-        redoc_url="/redoc" if not is_production() else None,
-        openapi_url="/openapi.json" if not is_production() else None,
+        docs_url="/docs" if not production else None,
+        redoc_url="/redoc" if not production else None,
+        openapi_url="/openapi.json" if not production else None,
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
         contact={
             "name": settings.COMPANY_NAME,
             "email": settings.COMPANY_EMAIL,
@@ -148,59 +275,38 @@ def create_application() -> FastAPI:
     )
     
     # Trusted Host middleware for production
-    if is_production():
+    if production:
         app.add_middleware(
             TrustedHostMiddleware,
             allowed_hosts=["ignux.com", "www.ignux.com", "api.ignux.com"]
         )
     
     # HTTPS redirect for production
-    if is_production() and not settings.DEBUG:
+    if production and not settings.DEBUG:
         app.add_middleware(HTTPSRedirectMiddleware)
     
+    # Brotli for clients that accept it (optional dependency). Added before
+    # GZip so it sits inside it: GZip passes already-encoded responses through
+    if BrotliMiddleware is not None:
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=4,
+            minimum_size=1024,
+            gzip_fallback=False,  # GZipMiddleware below handles gzip clients
+        )
+    
     # GZip compression for responses
     app.add_middleware(
         GZipMiddleware,
-        minimum_size=1000,  # Only compress responses > 1KB
+        minimum_size=1024,  # Only compress responses > 1KB
+        compresslevel=5,  # Close to level 9's ratio at a fraction of the CPU
     )
     
     # Custom rate limiting middleware
-    app.add_middleware(
-        RateLimitMiddleware,
-        limit=settings.RATE_LIMIT_PER_MINUTE,
-        window=60,  # 1 minute window
-    )
-    
-    # Request timing middleware
-    @app.middleware("http")
-    async def add_process_time_header(request: Request, call_next) -> Response:
-        """Add X-Process-Time header to responses."""
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        # Log slow requests
-        if process_time > 2.0:  # More than 2 seconds is slow
-            logger.warning(
-                "Slow request: %s %s took %.2f seconds",
-                request.method,
-                request.url.path,
-                process_time
-            )
-        
-        return response
+    app.add_middleware(RateLimitMiddleware, **rate_limit_kwargs())
     
-    # Request ID middleware
-    @app.middleware("http")
-    async def add_request_id(request: Request, call_next) -> Response:
-        """Add X-Request-ID header to requests and responses."""
-        import uuid
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
-        return response
+    # Request ID and timing headers (pure ASGI, outermost of our own layers)
+    app.add_middleware(RequestContextMiddleware)
     
     # ============ Exception Handlers ============
     
@@ -208,7 +314,7 @@ def create_application() -> FastAPI:
     async def validation_exception_handler(
         request: Request, 
         exc: RequestValidationError
-    ) -> JSONResponse:
+    ) -> ORJSONResponse:
         """Handle Pydantic validation errors with detailed response."""
         logger.warning(
             "Validation error for %s %s: %s",
@@ -216,7 +322,7 @@ def create_application() -> FastAPI:
             request.url.path,
             exc.errors()
         )
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=422,
             content={
                 "success": False,
@@ -230,9 +336,9 @@ def create_application() -> FastAPI:
     async def global_exception_handler(
         request: Request, 
         exc: Exception
-    ) -> JSONResponse:
+    ) -> ORJSONResponse:
         """Handle all uncaught exceptions."""
-        error_id = str(uuid.uuid4())
+        error_id = secrets.token_hex(16)
         logger.error(
             "Unhandled exception [%s] for %s %s: %s",
             error_id,
@@ -246,7 +352,7 @@ def create_application() -> FastAPI:
         if settings.SENTRY_DSN:
             sentry_sdk.capture_exception(exc)
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -261,7 +367,7 @@ def create_application() -> FastAPI:
     # Mount static files directory
     app.mount(
         "/static", 
-        StaticFiles(directory="static"), 
+        CachedStaticFiles(directory="static"), 
         name="static"
     )
     
@@ -292,24 +398,35 @@ def create_application() -> FastAPI:
     # ============ Prometheus Metrics ============
     
     # Initialize Prometheus metrics endpoint
-    if is_production():
-        Instrumentator().instrument(app).expose(app, endpoint="/metrics")
+    if production:
+        # Imported here so non-production processes never load it
+        from prometheus_fastapi_instrumentator import Instrumentator
+        
+        Instrumentator(
+            # Probes, the scrape itself and static files would dominate the
+            # histograms without saying anything about the API
+            excluded_handlers=["/health", "/metrics", "/static/.*"],
+            should_group_status_codes=True,
+        ).instrument(app).expose(app, endpoint="/metrics", include_in_schema=False)
     
     # ============ Health and Info Endpoints ============
     
+    # Invariant for the life of the app, so built once
+    root_info = {
+        "message": "Welcome to IGNUX API",
+        "version": settings.VERSION,
+        "environment": settings.ENVIRONMENT,
+        "service": "Fireworks & Stage FX Services",
+        "company": settings.COMPANY_NAME,
+        "docs": "/docs" if not production else None,
+        "health": "/health",
+        "status": "operational",
+    }
+    
     @app.get("/", tags=["info"])
     async def read_root() -> Dict[str, Any]:
         """Root endpoint with API information."""
-        return {
-            "message": "Welcome to IGNUX API",
-            "version": settings.VERSION,
-            "environment": settings.ENVIRONMENT,
-            "service": "Fireworks & Stage FX Services",
-            "company": settings.COMPANY_NAME,
-            "docs": "/docs" if not is_production() else None,
-            "health": "/health",
-            "status": "operational",
-        }
+        return root_info
     
     @app.get("/health", tags=["health"])
     async def health_check() -> Dict[str, Any]:
@@ -326,27 +443,20 @@ def create_application() -> FastAPI:
             "environment": settings.ENVIRONMENT,
         }
         
-        # Check database connectivity
-        try:
-            from app.database import SessionLocal
-            db = SessionLocal()
-            db.execute("SELECT 1")
-            db.close()
+        # Check database connectivity (blocking I/O, so off the event loop)
+        database_error = await run_in_threadpool(probe_database)
+        if database_error is None:
             health_status["database"] = "connected"
-        except Exception as e:
+        else:
             health_status["database"] = "disconnected"
             health_status["status"] = "unhealthy"
-            health_status["database_error"] = str(e)
+            health_status["database_error"] = database_error
         
         # Check email service (if configured)
         if settings.SMTP_USERNAME:
-            try:
-                import smtplib
-                with smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-                    server.starttls()
-                    server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+            if await run_in_threadpool(_probe_email):
                 health_status["email_service"] = "connected"
-            except Exception as e:
+            else:
                 health_status["email_service"] = "disconnected"
                 health_status["status"] = "degraded"
         
@@ -355,32 +465,7 @@ def create_application() -> FastAPI:
     @app.get("/info", tags=["info"])
     async def system_info() -> Dict[str, Any]:
         """System information endpoint."""
-        import platform
-        import sys
-        
-        return {
-            "system": {
-                "python_version": sys.version,
-                "platform": platform.platform(),
-                "processor": platform.processor(),
-            },
-            "application": {
-                "name": settings.PROJECT_NAME,
-                "version": settings.VERSION,
-                "environment": settings.ENVIRONMENT,
-                "debug": settings.DEBUG,
-            },
-            "company": {
-                "name": settings.COMPANY_NAME,
-                "brand": settings.BRAND_NAME,
-                "email": settings.COMPANY_EMAIL,
-                "phone": settings.COMPANY_PHONE,
-            },
-            "developer": {
-                "name": settings.DEVELOPER,
-                "url": settings.DEVELOPER_URL,
-            },
-        }
+        return _system_info()
     
     return app
 
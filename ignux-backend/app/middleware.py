@@ -9,22 +9,102 @@ This module contains custom middleware implementations for:
 - Performance monitoring
 """
 
+import itertools
+import os
+import secrets
 import time
-from typing import Dict, Tuple
-from collections import defaultdict
+from typing import Any, Dict, Tuple
+from array import array
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-import redis
+from fastapi import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import redis.asyncio as aioredis
+from redis.exceptions import NoScriptError
 import logging
 
-from app.config import settings
+from app.config import settings, is_production
 
 logger = logging.getLogger(__name__)
 
+# Sliding-window rate limit check, run atomically inside Redis so the
+# trim/count/admit sequence costs one round trip and concurrent requests
+# cannot both slip under the limit.
+# KEYS[1]: limiter key; ARGV: now, window, limit, unique member
+# Returns {allowed (1/0), remaining}
+SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[1], window + 10)
+    return {1, limit - count - 1}
+end
+return {0, 0}
+"""
+
+# Fixed-window counter: one integer key per (client, path, window bucket)
+# instead of one ZSET entry per request. KEYS[1]: bucket key; ARGV: window
+# Returns the request count in the bucket, including this one
+FIXED_WINDOW_LUA = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+
+# Local limiter checks between sweeps of idle keys
+LOCAL_SWEEP_INTERVAL = 1000
+
+# Hard cap on keys held by the local limiter; once reached, the least
+# recently used LOCAL_EVICT_BATCH keys are evicted in one go
+LOCAL_MAX_KEYS = 100_000
+LOCAL_EVICT_BATCH = LOCAL_MAX_KEYS // 10
+
+# The local limiter splits each window into this many counting buckets
+LOCAL_BUCKETS = 6
+
+RATE_LIMIT_SCRIPTS = {
+    "fixed_window": FIXED_WINDOW_LUA,
+    "sliding_window": SLIDING_WINDOW_LUA,
+}
+
+
+class _BucketWindow:
+    """
+    Per-key request counts for the local limiter, as a ring of time buckets.
+    
+    Memory is constant per key and a check is O(buckets) with no
+    allocation, at the cost of bucket-width granularity at the trailing
+    edge of the window.
+    """
+    
+    __slots__ = ("counters", "head")
+    
+    def __init__(self, buckets: int, head: int):
+        self.counters = array("I", bytes(4 * buckets))
+        self.head = head  # Absolute number of the newest bucket
+    
+    def advance(self, slot: int) -> None:
+        """Move the newest bucket to ``slot``, zeroing the buckets that expire."""
+        buckets = len(self.counters)
+        steps = slot - self.head
+        if steps <= 0:
+            return
+        if steps >= buckets:
+            for i in range(buckets):
+                self.counters[i] = 0
+        else:
+            for i in range(self.head + 1, slot + 1):
+                self.counters[i % buckets] = 0
+        self.head = slot
+
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
     Rate limiting middleware to prevent API abuse.
     
@@ -32,12 +112,16 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     falls back to in-memory storage in development.
     """
     
+    _DENIED_BODY = b'{"detail": "Rate limit exceeded"}'
+    
     def __init__(
         self, 
         app: ASGIApp, 
         limit: int = 60, 
         window: int = 60,
-        redis_url: str = None
+        redis_url: str = None,
+        algorithm: str = "fixed_window",
+        shard: str = "ip",
     ):
         """
         Initialize rate limiter.
@@ -47,148 +131,200 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             limit: Maximum requests per window
             window: Time window in seconds
             redis_url: Redis URL for distributed rate limiting
+            algorithm: Redis algorithm, "fixed_window" (O(1) counter per
+                window) or "sliding_window" (exact rolling window, one ZSET
+                entry per request)
+            shard: Part of the key used as the Redis Cluster hash tag. "ip"
+                keeps all of one client's counters on one slot (so a script
+                can touch several of them atomically) but concentrates a
+                hot client on one node; "path" spreads clients out and
+                concentrates hot endpoints instead
         """
-        super().__init__(app)
+        self.app = app
+        if algorithm not in RATE_LIMIT_SCRIPTS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        if shard not in ("ip", "path"):
+            raise ValueError(f"Unknown rate limit shard: {shard}")
         self.limit = limit
         self.window = window
+        self.algorithm = algorithm
+        self.shard = shard
+        # Fixed part of every 429 response's headers
+        self._denied_headers = {
+            "Content-Type": "application/json",
+            "Retry-After": str(window),
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": "0",
+        }
+        self._script = RATE_LIMIT_SCRIPTS[algorithm]
         self.redis_client = None
-        self.local_store = defaultdict(list)  # Fallback for development
+        self._script_sha = None
+        # Fallback for development: key -> _BucketWindow
+        self.local_store: Dict[str, _BucketWindow] = {}
+        self._bucket_width = max(1, -(-window // LOCAL_BUCKETS))
+        self._bucket_count = -(-window // self._bucket_width)
+        self._local_checks = 0  # Drives the periodic sweep of idle keys
         
-        # Initialize Redis client if available
-        if redis_url and settings.is_production():
-            try:
-                self.redis_client = redis.Redis.from_url(
-                    redis_url,
-                    decode_responses=True,
-                    socket_connect_timeout=5,
-                    socket_timeout=5,
-                )
-                # Test connection
-                self.redis_client.ping()
-                logger.info("Redis rate limiting enabled")
-            except Exception as e:
-                logger.warning("Redis connection failed, using local rate limiting: %s", e)
-                self.redis_client = None
+        # Initialize Redis client if available. The asyncio client keeps
+        # Redis round trips off the event loop; it connects lazily, so the
+        # connection test happens on the first request (see _redis_ready)
+        if redis_url and is_production():
+            self.redis_client = aioredis.Redis.from_url(
+                redis_url,
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5,
+            )
     
-    async def dispatch(self, request: Request, call_next) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Process request with rate limiting.
         
-        Args:
-            request: Incoming request
-            call_next: Next middleware or route handler
-            
-        Returns:
-            Response with rate limit headers
+        Rejected requests get a 429 without reaching the app; admitted
+        ones get rate limit headers added to their response.
         """
-        # Get client identifier (IP address)
-        client_ip = request.client.host if request.client else "unknown"
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        # Get client identifier (IP address), straight from the ASGI scope
+        # rather than through Request/URL wrappers
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
         
         # Generate key for rate limiting
-        key = f"rate_limit:{client_ip}:{request.url.path}"
+        path = scope["path"]
+        # The {...} hash tag decides the Redis Cluster slot
+        if self.shard == "ip":
+            key = f"rl:{{{client_ip}}}:{path}"
+        else:
+            key = f"rl:{client_ip}:{{{path}}}"
         current_time = int(time.time())
         
         # Check rate limit
-        is_allowed = self._check_rate_limit(key, current_time)
+        is_allowed, remaining = await self._check_rate_limit(key, current_time)
         
         if not is_allowed:
             logger.warning(
                 "Rate limit exceeded for %s from %s",
-                request.url.path,
+                path,
                 client_ip
             )
-            return Response(
-                content='{"detail": "Rate limit exceeded"}',
+            response = Response(
+                content=self._DENIED_BODY,
                 status_code=429,
                 headers={
-                    "Content-Type": "application/json",
-                    "Retry-After": str(self.window),
-                    "X-RateLimit-Limit": str(self.limit),
-                    "X-RateLimit-Remaining": "0",
+                    **self._denied_headers,
                     "X-RateLimit-Reset": str(current_time + self.window),
                 }
             )
+            await response(scope, receive, send)
+            return
         
-        # Calculate remaining requests
-        remaining = self._get_remaining_requests(key, current_time)
+        rate_limit_headers = [
+            (b"x-ratelimit-limit", str(self.limit).encode()),
+            (b"x-ratelimit-remaining", str(remaining).encode()),
+            (b"x-ratelimit-reset", str(current_time + self.window).encode()),
+        ]
         
-        # Process request
-        response = await call_next(request)
-        
-        # Add rate limit headers to response
-        response.headers.update({
-            "X-RateLimit-Limit": str(self.limit),
-            "X-RateLimit-Remaining": str(remaining),
-            "X-RateLimit-Reset": str(current_time + self.window),
-        })
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).raw.extend(rate_limit_headers)
+            await send(message)
         
-        return response
+        # Process request
+        await self.app(scope, receive, send_with_headers)
     
-    def _check_rate_limit(self, key: str, current_time: int) -> bool:
-        """Check if request is within rate limit."""
-        if self.redis_client:
-            return self._check_redis_rate_limit(key, current_time)
+    async def _check_rate_limit(self, key: str, current_time: int) -> Tuple[bool, int]:
+        """Check if request is within rate limit; returns (allowed, remaining)."""
+        if self.redis_client and await self._redis_ready():
+            return await self._check_redis_rate_limit(key, current_time)
         else:
             return self._check_local_rate_limit(key, current_time)
     
-    def _check_redis_rate_limit(self, key: str, current_time: int) -> bool:
-        """Check rate limit using Redis."""
+    async def _redis_ready(self) -> bool:
+        """Test the Redis connection and register the script on first use."""
+        if self._script_sha is None:
+            try:
+                await self.redis_client.ping()
+                self._script_sha = await self.redis_client.script_load(self._script)
+                logger.info("Redis rate limiting enabled")
+            except Exception as e:
+                logger.warning("Redis connection failed, using local rate limiting: %s", e)
+                self.redis_client = None
+                return False
+        return True
+    
+    async def _check_redis_rate_limit(self, key: str, current_time: int) -> Tuple[bool, int]:
+        """Check rate limit using the atomic Redis script."""
+        if self.algorithm == "fixed_window":
+            keys_and_args = (f"{key}:{current_time // self.window}", self.window)
+        else:
+            keys_and_args = (key, current_time, self.window, self.limit, secrets.token_hex(8))
         try:
-            # Use Redis pipeline for atomic operations
-            pipe = self.redis_client.pipeline()
-            
-            # Remove old timestamps
-            pipe.zremrangebyscore(key, 0, current_time - self.window)
-            
-            # Get current count
-            pipe.zcard(key)
-            
-            # If under limit, add current timestamp
-            pipe.zadd(key, {str(current_time): current_time})
-            
-            # Set expiry on key
-            pipe.expire(key, self.window)
-            
-            # Execute pipeline
-            results = pipe.execute()
-            current_count = results[1]
-            
-            return current_count < self.limit
+            try:
+                result = await self.redis_client.evalsha(self._script_sha, 1, *keys_and_args)
+            except NoScriptError:
+                # Script cache was flushed (e.g. Redis restart); EVAL reloads it
+                result = await self.redis_client.eval(self._script, 1, *keys_and_args)
         except Exception as e:
             logger.error("Redis rate limit check failed: %s", e)
             # Fallback to local rate limiting
             return self._check_local_rate_limit(key, current_time)
+        
+        if self.algorithm == "fixed_window":
+            count = int(result)
+            return count <= self.limit, max(0, self.limit - count)
+        allowed, remaining = result
+        return bool(allowed), int(remaining)
     
-    def _check_local_rate_limit(self, key: str, current_time: int) -> bool:
+    def _check_local_rate_limit(self, key: str, current_time: int) -> Tuple[bool, int]:
         """Check rate limit using local memory storage."""
-        # Clean old timestamps
-        timestamps = self.local_store[key]
-        timestamps[:] = [ts for ts in timestamps if ts > current_time - self.window]
+        slot = current_time // self._bucket_width
+        
+        # Every so often drop keys (clients/paths) that have gone quiet, so
+        # the store doesn't grow without bound
+        self._local_checks += 1
+        if self._local_checks % LOCAL_SWEEP_INTERVAL == 0:
+            self._sweep_local_store(slot)
+        
+        # Pop and re-insert so the dict's insertion order doubles as LRU
+        # order: active clients stay at the end, away from eviction
+        window = self.local_store.pop(key, None)
+        if window is None:
+            if len(self.local_store) >= LOCAL_MAX_KEYS:
+                self._evict_local_keys()
+            window = _BucketWindow(self._bucket_count, slot)
+        else:
+            window.advance(slot)
+        self.local_store[key] = window
         
         # Check if under limit
-        if len(timestamps) < self.limit:
-            timestamps.append(current_time)
-            return True
-        return False
+        count = sum(window.counters)
+        if count < self.limit:
+            window.counters[window.head % self._bucket_count] += 1
+            return True, self.limit - count - 1
+        return False, 0
     
-    def _get_remaining_requests(self, key: str, current_time: int) -> int:
-        """Get number of remaining requests."""
-        if self.redis_client:
-            try:
-                # Clean old timestamps
-                self.redis_client.zremrangebyscore(key, 0, current_time - self.window)
-                current_count = self.redis_client.zcard(key)
-                return max(0, self.limit - current_count)
-            except Exception as e:
-                logger.error("Redis remaining requests check failed: %s", e)
-                return self.limit
-        else:
-            timestamps = self.local_store[key]
-            timestamps[:] = [ts for ts in timestamps if ts > current_time - self.window]
-            return max(0, self.limit - len(timestamps))
+    def _sweep_local_store(self, slot: int) -> None:
+        """Remove keys whose newest bucket has left the window."""
+        idle = [key for key, window in self.local_store.items() if slot - window.head >= self._bucket_count]
+        for key in idle:
+            del self.local_store[key]
+    
+    def _evict_local_keys(self) -> None:
+        """
+        Drop the LOCAL_EVICT_BATCH least recently used keys.
+        
+        Evicting a batch keeps a flood of one-off keys to one O(batch) pass
+        per LOCAL_EVICT_BATCH inserts; idle keys are otherwise left to the
+        periodic sweep.
+        """
+        for key in list(itertools.islice(self.local_store, LOCAL_EVICT_BATCH)):
+            del self.local_store[key]
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """
     Middleware to add security headers to responses.
     
@@ -200,9 +336,8 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     - Permissions Policy
     """
     
-    async def dispatch(self, request: Request, call_next) -> Response:
-        """Add security headers to response."""
-        response = await call_next(request)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         
         security_headers = {
             # Prevent clickjacking
@@ -225,7 +360,7 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         }
         
         # Add Content Security Policy (CSP) in production
-        if settings.is_production():
+        if is_production():
             security_headers["Content-Security-Policy"] = (
                 "default-src 'self'; "
                 "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
@@ -238,90 +373,150 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
                 "form-action 'self';"
             )
         
-        # Add all security headers
-        for header, value in security_headers.items():
-            response.headers[header] = value
+        # The headers never vary per request, so they are encoded once into
+        # the raw (name, value) pairs ASGI sends
+        self._raw_headers = [
+            (header.lower().encode("latin-1"), value.encode("latin-1"))
+            for header, value in security_headers.items()
+        ]
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Add security headers to response."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).raw.extend(self._raw_headers)
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_with_headers)
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+class RequestLoggingMiddleware:
     """
     Middleware for structured request logging.
     
     Logs all requests with details for monitoring and debugging.
     """
     
-    async def dispatch(self, request: Request, call_next) -> Response:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Log request details."""
-        start_time = time.time()
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Extract request details
-        request_details = {
-            "method": request.method,
-            "path": request.url.path,
-            "query": str(request.query_params),
-            "client_ip": request.client.host if request.client else "unknown",
-            "user_agent": request.headers.get("user-agent", ""),
-            "request_id": getattr(request.state, "request_id", None),
-        }
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        status_code = 500  # Reported if the app fails before responding
+        # Checked once per request; with INFO off (the usual production
+        # level) no log arguments are built and send is not wrapped
+        log_info = logger.isEnabledFor(logging.INFO)
         
-        # Log request start
-        logger.info(
-            "Request started: %s %s from %s",
-            request.method,
-            request.url.path,
-            request.client.host if request.client else "unknown"
-        )
+        if log_info:
+            client = scope.get("client")
+            logger.info(
+                "Request started: %s %s from %s",
+                method,
+                path,
+                client[0] if client else "unknown"
+            )
+            
+            async def send_and_capture_status(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                await send(message)
+        else:
+            send_and_capture_status = send
         
         # Process request
         try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            
-            # Log successful response
+            await self.app(scope, receive, send_and_capture_status)
+        except Exception as e:
+            if logger.isEnabledFor(logging.ERROR):
+                logger.error(
+                    "Request failed: %s %s - Error: %s - Time: %.3fs",
+                    method,
+                    path,
+                    e,
+                    time.perf_counter() - start_time,
+                    exc_info=e
+                )
+            raise
+        
+        if log_info:
             logger.info(
                 "Request completed: %s %s - Status: %d - Time: %.3fs",
-                request.method,
-                request.url.path,
-                response.status_code,
-                process_time
-            )
-            
-        except Exception as e:
-            process_time = time.time() - start_time
-            
-            # Log error
-            logger.error(
-                "Request failed: %s %s - Error: %s - Time: %.3fs",
-                request.method,
-                request.url.path,
-                str(e),
-                process_time,
-                exc_info=True
+                method,
+                path,
+                status_code,
+                time.perf_counter() - start_time
             )
-            raise
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware that tags each request with an ID and timing.
+    
+    Sets ``request.state.request_id`` and adds ``X-Request-ID`` and
+    ``X-Process-Time`` response headers; slow requests are logged. Being
+    plain ASGI, it avoids the per-request task group and body streaming
+    bridge that ``BaseHTTPMiddleware`` / ``@app.middleware("http")`` add.
+    """
+    
+    slow_request_seconds = 2.0
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        return response
+        start_time = time.perf_counter()
+        request_id = secrets.token_hex(16)
+        # Starlette's request.state is backed by scope["state"]
+        scope.setdefault("state", {})["request_id"] = request_id
+        
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start_time
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(process_time))
+                headers.append("X-Request-ID", request_id)
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            process_time = time.perf_counter() - start_time
+            if process_time > self.slow_request_seconds:
+                logger.warning(
+                    "Slow request: %s %s took %.2f seconds",
+                    scope["method"],
+                    scope["path"],
+                    process_time
+                )
 
 
-# Middleware factory functions for easy configuration
+# Middleware configuration helpers
+#
+# Starlette instantiates middleware itself when it builds the stack on the
+# first request, i.e. inside the worker process after any fork, so these
+# return constructor kwargs for app.add_middleware() rather than instances.
 
-def get_rate_limit_middleware():
-    """Factory function for rate limit middleware."""
-    return RateLimitMiddleware(
-        app=None,  # Will be set by FastAPI
+def rate_limit_kwargs() -> Dict[str, Any]:
+    """Keyword arguments for ``app.add_middleware(RateLimitMiddleware, ...)``."""
+    return dict(
         limit=settings.RATE_LIMIT_PER_MINUTE,
         window=60,
-        redis_url=os.getenv("REDIS_URL") if settings.is_production() else None
+        redis_url=os.getenv("REDIS_URL") if is_production() else None,
+        shard=settings.RATE_LIMIT_SHARD,
     )
-
-
-def get_security_headers_middleware():
-    """Factory function for security headers middleware."""
-    return SecurityHeadersMiddleware(app=None)
-
-
-def get_request_logging_middleware():
-    """Factory function for request logging middleware."""
-    return RequestLoggingMiddleware(app=None)
\ No newline at end of file
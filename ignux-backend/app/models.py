@@ -8,8 +8,8 @@ for optimal database performance.
 """
 
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime, Boolean, 
-    Text, Enum, ForeignKey, Index, CheckConstraint, UniqueConstraint
+    Column, Integer, SmallInteger, String, Numeric, DateTime, Boolean, 
+    Text, Enum, ForeignKey, Index, CheckConstraint, UniqueConstraint, JSON
 )
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
@@ -20,6 +20,31 @@ from typing import Optional, List, Dict, Any
 from app.database import Base  # Use the centralized Base
 
 
+# Native JSONB on PostgreSQL; plain JSON elsewhere (e.g. the SQLite dev database)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+# Audit timestamps are timestamptz, filled in by the database on INSERT
+Timestamp = DateTime(timezone=True)
+
+# Money is stored as numeric(10,2) but handed to the app as float, so the
+# existing arithmetic (deposits, balances, stats) is unchanged
+Money = Numeric(10, 2, asdecimal=False)
+
+
+def _enum_values(enum_cls: type) -> List[str]:
+    """Persist enum members by their lowercase value rather than their name."""
+    return [member.value for member in enum_cls]
+
+
+def _normalize_email(email: str) -> str:
+    """Strip and lowercase an email, rejecting one without a local part and domain."""
+    email = email.strip()
+    at = email.find('@')
+    if at <= 0 or at == len(email) - 1:
+        raise ValueError("Invalid email address")
+    return email.lower()
+
+
 class BookingStatus(str, enum.Enum):
     """
     Enumeration for booking status values.
@@ -71,23 +96,25 @@ class ContactMessage(Base):
     event_date = Column(DateTime, nullable=True, index=True)
     budget = Column(String(50), nullable=True)
     message = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=func.now(), index=True)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False)
     is_read = Column(Boolean, default=False, index=True)
     responded = Column(Boolean, default=False, index=True)
     notes = Column(Text, nullable=True)
     
-    # Indexes for common query patterns
+    # Indexes for common query patterns; created_at is the leading column
+    # of the first composite, so it needs no index of its own
     __table_args__ = (
         Index('ix_contact_messages_created_at_read', 'created_at', 'is_read'),
         Index('ix_contact_messages_email_responded', 'email', 'responded'),
+        # Same rule as _normalize_email for rows written without the ORM
+        # validator (bulk inserts, COPY)
+        CheckConstraint("email LIKE '_%@_%'", name='check_contact_email_format'),
     )
     
     @validates('email')
     def validate_email(self, key: str, email: str) -> str:
         """Validate email format before saving."""
-        if '@' not in email:
-            raise ValueError("Invalid email address")
-        return email.lower()  # Store emails in lowercase
+        return _normalize_email(email)  # Store emails in lowercase
 
 
 class Booking(Base):
@@ -103,7 +130,7 @@ class Booking(Base):
     
     # ============ Client Information ============
     client_name = Column(String(100), nullable=False, index=True)
-    client_email = Column(String(100), nullable=False, index=True)
+    client_email = Column(String(100), nullable=False)
     client_phone = Column(String(20), nullable=False, index=True)
     client_address = Column(String(200), nullable=True)
     
@@ -119,41 +146,55 @@ class Booking(Base):
     # ============ Service Details ============
     service_type = Column(String(50), nullable=False, index=True)
     service_package = Column(String(50), nullable=False)
-    additional_services = Column(Text, nullable=True)  # JSON string
+    additional_services = Column(JSONType, nullable=True)
     
     # ============ Pyrotechnics Details ============
     display_duration = Column(String(20), nullable=False)
     display_type = Column(String(50), nullable=False)  # ground, aerial, mixed
     colors_requested = Column(String(200), nullable=True)
     music_sync = Column(Boolean, default=False)
-    special_effects = Column(Text, nullable=True)
+    special_effects = Column(JSONType, nullable=True)
     
     # ============ Pricing ============
-    base_price = Column(Float, nullable=False)
-    additional_charges = Column(Float, default=0.0)
-    discount = Column(Float, default=0.0)
-    total_price = Column(Float, nullable=False)
-    deposit_paid = Column(Float, default=0.0)
-    balance_due = Column(Float, nullable=False)
+    base_price = Column(Money, nullable=False)
+    additional_charges = Column(Money, default=0.0)
+    discount = Column(Money, default=0.0)
+    total_price = Column(Money, nullable=False)
+    deposit_paid = Column(Money, default=0.0)
+    balance_due = Column(Money, nullable=False)
     
     # ============ Status ============
+    # Stored as VARCHAR + CHECK rather than a native PostgreSQL ENUM, so new
+    # statuses need no ALTER TYPE; values still load as the Python enums
     booking_status = Column(
-        Enum(BookingStatus), 
+        Enum(
+            BookingStatus,
+            native_enum=False,
+            length=20,
+            values_callable=_enum_values,
+            create_constraint=True,
+            name='ck_booking_status',
+        ),
         default=BookingStatus.PENDING, 
-        nullable=False,
-        index=True
+        nullable=False
     )
     payment_status = Column(
-        Enum(PaymentStatus), 
+        Enum(
+            PaymentStatus,
+            native_enum=False,
+            length=20,
+            values_callable=_enum_values,
+            create_constraint=True,
+            name='ck_payment_status',
+        ),
         default=PaymentStatus.PENDING, 
-        nullable=False,
-        index=True
+        nullable=False
     )
     
     # ============ Dates ============
-    created_at = Column(DateTime, default=func.now(), index=True)
-    confirmed_at = Column(DateTime, nullable=True, index=True)
-    completed_at = Column(DateTime, nullable=True, index=True)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False, index=True)
+    confirmed_at = Column(Timestamp, nullable=True, index=True)
+    completed_at = Column(Timestamp, nullable=True, index=True)
     
     # ============ Additional Information ============
     special_instructions = Column(Text, nullable=True)
@@ -164,13 +205,14 @@ class Booking(Base):
     
     # ============ Staff Assignment ============
     assigned_team_leader = Column(String(100), nullable=True, index=True)
-    team_size = Column(Integer, default=3)
+    team_size = Column(SmallInteger, default=3)
     
     # ============ Audit Fields ============
     updated_at = Column(
-        DateTime, 
-        default=func.now(), 
+        Timestamp, 
+        server_default=func.now(), 
         onupdate=func.now(), 
+        nullable=False,
         index=True
     )
     created_by = Column(String(100), nullable=True)
@@ -178,10 +220,22 @@ class Booking(Base):
     
     # ============ Indexes and Constraints ============
     __table_args__ = (
-        # Composite index for common queries
+        # Composite indexes for common queries; (booking_status, event_date)
+        # serves the status filter + event_date range/order in get_bookings.
+        # booking_status, client_email and payment_status are only indexed
+        # as leading columns here rather than on their own.
         Index('ix_bookings_status_date', 'booking_status', 'event_date'),
         Index('ix_bookings_email_status', 'client_email', 'booking_status'),
-        Index('ix_bookings_payment_status', 'payment_status', 'balance_due'),
+        Index('ix_bookings_payment_status_balance', 'payment_status', 'balance_due'),
+        # Partial index over upcoming work only (pending/confirmed); built
+        # from the column so the predicate matches the stored values
+        Index(
+            'ix_bookings_open',
+            'event_date',
+            postgresql_where=booking_status.in_(
+                [BookingStatus.PENDING, BookingStatus.CONFIRMED]
+            ),
+        ),
         
         # Check constraints for data integrity
         CheckConstraint('total_price >= 0', name='check_total_price_positive'),
@@ -202,7 +256,7 @@ class Booking(Base):
         """Validate total price."""
         if price <= 0:
             raise ValueError("Total price must be positive")
-        return round(price, 2)  # Store with 2 decimal places
+        return price  # numeric(10,2) rounds to 2 decimal places on write
 
 
 class Service(Base):
@@ -218,16 +272,16 @@ class Service(Base):
     slug = Column(String(100), unique=True, nullable=False, index=True)
     category = Column(String(50), nullable=False, index=True)
     description = Column(Text, nullable=False)
-    features = Column(Text, nullable=True)  # JSON string
-    base_price = Column(Float, nullable=False)
-    price_range_min = Column(Float, nullable=False)
-    price_range_max = Column(Float, nullable=False)
+    features = Column(JSONType, nullable=True)
+    base_price = Column(Money, nullable=False)
+    price_range_min = Column(Money, nullable=False)
+    price_range_max = Column(Money, nullable=False)
     duration = Column(String(50), nullable=False)
     is_popular = Column(Boolean, default=False, index=True)
     is_active = Column(Boolean, default=True, index=True)
-    display_order = Column(Integer, default=0, index=True)
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    display_order = Column(SmallInteger, default=0, index=True)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Optional fields for enhanced service management
     image_url = Column(String(500), nullable=True)
@@ -237,6 +291,11 @@ class Service(Base):
     
     __table_args__ = (
         Index('ix_services_category_popular', 'category', 'is_popular'),
+        # GIN index for containment queries (features @> '["..."]');
+        # only meaningful on PostgreSQL, so other dialects skip it
+        Index(
+            'ix_services_features_gin', 'features', postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
         UniqueConstraint('slug', name='uq_services_slug'),
         CheckConstraint('price_range_max >= price_range_min', 
                        name='check_price_range_valid'),
@@ -257,17 +316,17 @@ class Testimonial(Base):
     client_name = Column(String(100), nullable=False, index=True)
     event_type = Column(String(50), nullable=False, index=True)
     event_date = Column(DateTime, nullable=True, index=True)
-    rating = Column(Integer, nullable=False, index=True)
+    rating = Column(SmallInteger, nullable=False, index=True)
     testimonial = Column(Text, nullable=False)
     is_approved = Column(Boolean, default=False, index=True)
     is_featured = Column(Boolean, default=False, index=True)
-    created_at = Column(DateTime, default=func.now(), index=True)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False, index=True)
     
     # Optional fields for enhanced testimonials
     client_location = Column(String(100), nullable=True)
     service_used = Column(String(100), nullable=True)
     verified_purchase = Column(Boolean, default=False)
-    helpful_votes = Column(Integer, default=0)
+    helpful_votes = Column(SmallInteger, default=0)
     
     __table_args__ = (
         Index('ix_testimonials_rating_approved', 'rating', 'is_approved'),
@@ -288,14 +347,14 @@ class NewsletterSubscriber(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(100), unique=True, nullable=False, index=True)
     name = Column(String(100), nullable=True)
-    subscribed_at = Column(DateTime, default=func.now(), index=True)
-    unsubscribed_at = Column(DateTime, nullable=True)
+    subscribed_at = Column(Timestamp, server_default=func.now(), nullable=False, index=True)
+    unsubscribed_at = Column(Timestamp, nullable=True)
     is_active = Column(Boolean, default=True, index=True)
     source = Column(String(50), default="website", index=True)
     
     # GDPR and compliance fields
     consent_given = Column(Boolean, default=True)
-    consent_date = Column(DateTime, default=func.now())
+    consent_date = Column(Timestamp, server_default=func.now())
     ip_address = Column(String(45), nullable=True)  # Supports IPv6
     user_agent = Column(Text, nullable=True)
     
@@ -305,6 +364,7 @@ class NewsletterSubscriber(Base):
     
     __table_args__ = (
         Index('ix_subscribers_active_source', 'is_active', 'source'),
+        CheckConstraint("email LIKE '_%@_%'", name='check_subscriber_email_format'),
         CheckConstraint(
             "unsubscribed_at IS NULL OR unsubscribed_at >= subscribed_at",
             name='check_unsubscribe_date'
@@ -314,9 +374,7 @@ class NewsletterSubscriber(Base):
     @validates('email')
     def validate_email(self, key: str, email: str) -> str:
         """Validate and normalize email addresses."""
-        if '@' not in email:
-            raise ValueError("Invalid email address")
-        return email.lower().strip()
+        return _normalize_email(email)
 
 
 # Import models to ensure they're registered with Base
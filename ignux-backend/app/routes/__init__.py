@@ -15,6 +15,20 @@ Structure:
 - payments.py: Payment processing (future)
 """
 
-from app.routes import auth, bookings, contacts, services, admin
+import importlib
 
-__all__ = ["auth", "bookings", "contacts", "services", "admin"]
\ No newline at end of file
+__all__ = ["auth", "bookings", "contacts", "services", "admin"]
+
+
+def __getattr__(name: str):
+    """
+    Import route modules on first access (PEP 562).
+    
+    ``from app.routes import bookings`` keeps working, but only the
+    modules actually asked for are loaded.
+    """
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
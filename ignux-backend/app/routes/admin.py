@@ -10,19 +10,24 @@ This module handles all administrative functions including:
 - Audit logs
 """
 
+import asyncio
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import orjson
 import csv
 import io
 import logging
+import time
 
 from app.core.database import get_db
+from app.database import get_session_factory, probe_database
 from app.core.security import get_current_admin_user
 from app.core.config import settings
-from app.models import User, Booking, ContactMessage, Service, Testimonial, NewsletterSubscriber
+from app.models import User, Booking, BookingStatus, ContactMessage, Service, Testimonial, NewsletterSubscriber
 from app.schemas import (
     StatsResponse,
     UserResponse,
@@ -34,25 +39,51 @@ from app.schemas import (
     AdminDashboardStats,
     ReportRequest
 )
+from app import crud
 from app.crud import (
     booking as booking_crud,
-    contact as contact_crud,
-    service as service_crud,
-    testimonial as testimonial_crud,
-    newsletter as newsletter_crud,
     user as user_crud
 )
 
-router = APIRouter(prefix="/admin", tags=["admin"])
+router = APIRouter(prefix="/admin", tags=["admin"], default_response_class=ORJSONResponse)
 
 logger = logging.getLogger(__name__)
 
+# Dashboard reporting periods and how far back each one reaches
+PERIOD_DELTAS: Dict[str, timedelta] = {
+    "day": timedelta(0),
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+    "quarter": timedelta(days=90),
+    "year": timedelta(days=365),
+}
+
+# Short-lived cache of computed dashboard stats, keyed by
+# (period, day) -> (computed_at, stats). Entries are per worker process and
+# only expire by TTL, so figures may lag writes by up to the TTL.
+_DASHBOARD_STATS_TTL = 60.0
+_DASHBOARD_STATS_CACHE_SIZE = 16
+_dashboard_stats_cache: Dict[Tuple[str, str], Tuple[float, AdminDashboardStats]] = {}
+
+
+async def _run_in_session(func, *args):
+    """
+    Run a sync crud helper in the thread pool on a session of its own.
+    
+    Sessions are not thread-safe, so concurrent queries cannot share the
+    request's session.
+    """
+    def run():
+        with get_session_factory()() as session:
+            return func(session, *args)
+    
+    return await run_in_threadpool(run)
+
 
 @router.get("/dashboard/stats", response_model=AdminDashboardStats)
 async def get_dashboard_stats(
     period: str = Query("month", regex="^(day|week|month|quarter|year)$"),
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ) -> AdminDashboardStats:
     """
     Get comprehensive dashboard statistics for admin panel.
@@ -64,108 +95,77 @@ async def get_dashboard_stats(
     - Performance indicators
     """
     try:
-        # Calculate date range based on period
+        # Calculate date range based on period (validated by the regex above)
         end_date = date.today()
-        
-        if period == "day":
-            start_date = end_date
-        elif period == "week":
-            start_date = end_date - timedelta(days=7)
-        elif period == "month":
-            start_date = end_date - timedelta(days=30)
-        elif period == "quarter":
-            start_date = end_date - timedelta(days=90)
-        else:  # year
-            start_date = end_date - timedelta(days=365)
-        
-        # Get booking statistics
-        bookings = booking_crud.get_bookings(
-            db=db,
-            date_from=start_date,
-            date_to=end_date
-        )
-        
-        # Calculate revenue
-        total_revenue = sum(b.total_price for b in bookings if b.booking_status == "completed")
-        pending_revenue = sum(b.total_price for b in bookings if b.booking_status in ["pending", "confirmed"])
-        
-        # Get booking counts by status
-        status_counts = {}
-        for status in ["pending", "confirmed", "in_progress", "completed", "cancelled"]:
-            status_counts[status] = len([b for b in bookings if b.booking_status == status])
-        
-        # Get contact message statistics
-        contacts = contact_crud.get_contact_messages(
-            db=db,
-            date_from=start_date,
-            date_to=end_date
+        start_date = end_date - PERIOD_DELTAS[period]
+        
+        # Admin dashboards poll this endpoint; serve results computed in
+        # the last _DASHBOARD_STATS_TTL seconds from the cache
+        cache_key = (period, end_date.isoformat())
+        cached = _dashboard_stats_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < _DASHBOARD_STATS_TTL:
+            return cached[1]
+        
+        # Every figure below is aggregated in SQL; no rows are loaded. The
+        # five queries are independent, so they run concurrently, each on
+        # its own pooled connection in the thread pool
+        (
+            booking_stats,
+            contact_stats,
+            service_stats,
+            testimonial_stats,
+            subscriber_stats,
+        ) = await asyncio.gather(
+            _run_in_session(crud.aggregate_booking_stats, start_date, end_date),
+            _run_in_session(crud.aggregate_contact_stats, start_date, end_date),
+            _run_in_session(crud.aggregate_service_stats),
+            _run_in_session(crud.aggregate_testimonial_stats),
+            _run_in_session(crud.aggregate_subscriber_stats),
         )
         
-        # Calculate contact metrics
-        total_contacts = len(contacts)
-        unread_contacts = len([c for c in contacts if not c.is_read])
-        responded_contacts = len([c for c in contacts if c.responded])
-        
-        # Get service statistics
-        services = service_crud.get_services(db=db, active_only=False)
-        active_services = len([s for s in services if s.is_active])
-        
-        # Get testimonial statistics
-        testimonials = testimonial_crud.get_testimonials(db=db, approved_only=False)
-        approved_testimonials = len([t for t in testimonials if t.is_approved])
-        pending_testimonials = len([t for t in testimonials if not t.is_approved])
-        
-        # Get newsletter statistics
-        subscribers = newsletter_crud.get_subscribers(db=db)
-        active_subscribers = len([s for s in subscribers if s.is_active])
+        total_contacts = contact_stats["total"]
+        responded_contacts = contact_stats["responded"]
         
         # Calculate conversion rate (contacts to bookings)
         conversion_rate = 0
         if total_contacts > 0:
-            converted_bookings = len([b for b in bookings if b.created_at.date() >= start_date])
-            conversion_rate = (converted_bookings / total_contacts) * 100
+            conversion_rate = (booking_stats["created_in_range"] / total_contacts) * 100
         
-        # Calculate average booking value
-        avg_booking_value = 0
-        completed_bookings = [b for b in bookings if b.booking_status == "completed"]
-        if completed_bookings:
-            avg_booking_value = sum(b.total_price for b in completed_bookings) / len(completed_bookings)
-        
-        return AdminDashboardStats(
+        stats = AdminDashboardStats(
             period=period,
             start_date=start_date,
             end_date=end_date,
             
             # Revenue metrics
-            total_revenue=total_revenue,
-            pending_revenue=pending_revenue,
-            avg_booking_value=avg_booking_value,
+            total_revenue=booking_stats["total_revenue"],
+            pending_revenue=booking_stats["pending_revenue"],
+            avg_booking_value=booking_stats["avg_booking_value"],
             
             # Booking metrics
-            total_bookings=len(bookings),
-            booking_status_counts=status_counts,
-            upcoming_bookings=len([b for b in bookings if b.booking_status in ["confirmed", "in_progress"]]),
+            total_bookings=booking_stats["total"],
+            booking_status_counts=booking_stats["status_counts"],
+            upcoming_bookings=booking_stats["upcoming"],
             
             # Contact metrics
             total_contacts=total_contacts,
-            unread_contacts=unread_contacts,
+            unread_contacts=contact_stats["unread"],
             responded_contacts=responded_contacts,
             response_rate=(responded_contacts / total_contacts * 100) if total_contacts > 0 else 0,
             
             # Service metrics
-            total_services=len(services),
-            active_services=active_services,
-            popular_services_count=len([s for s in services if s.is_popular]),
+            total_services=service_stats["total"],
+            active_services=service_stats["active"],
+            popular_services_count=service_stats["popular"],
             
             # Testimonial metrics
-            total_testimonials=len(testimonials),
-            approved_testimonials=approved_testimonials,
-            pending_testimonials=pending_testimonials,
-            featured_testimonials=len([t for t in testimonials if t.is_featured]),
+            total_testimonials=testimonial_stats["total"],
+            approved_testimonials=testimonial_stats["approved"],
+            pending_testimonials=testimonial_stats["pending"],
+            featured_testimonials=testimonial_stats["featured"],
             
             # Newsletter metrics
-            total_subscribers=len(subscribers),
-            active_subscribers=active_subscribers,
+            total_subscribers=subscriber_stats["total"],
+            active_subscribers=subscriber_stats["active"],
             subscription_growth=0,  # Would need historical data
             
             # Conversion metrics
@@ -178,6 +178,11 @@ async def get_dashboard_stats(
             repeat_customer_rate=0  # Would need customer history
         )
         
+        if len(_dashboard_stats_cache) >= _DASHBOARD_STATS_CACHE_SIZE:
+            _dashboard_stats_cache.clear()  # Only stale days pile up
+        _dashboard_stats_cache[cache_key] = (time.monotonic(), stats)
+        return stats
+        
     except Exception as e:
         logger.error(f"Failed to fetch dashboard stats: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -186,6 +191,147 @@ async def get_dashboard_stats(
         )
 
 
+_CSV_EXPORT_HEADER = [
+    "ID", "Client Name", "Client Email", "Client Phone",
+    "Event Name", "Event Type", "Event Date", "Event Time",
+    "Location", "Service Package", "Duration",
+    "Total Price", "Deposit Paid", "Balance Due",
+    "Booking Status", "Payment Status",
+    "Created At", "Confirmed At", "Completed At",
+    "Special Instructions", "Emergency Contact"
+]
+
+
+def _csv_export_rows(
+    db: Session,
+    status: Optional[str],
+    date_from: Optional[date],
+    date_to: Optional[date]
+):
+    """
+    Yield the bookings export as CSV, one line at a time.
+    
+    Bookings are read as plain column rows (no ORM instances) in batches
+    from a server-side cursor and each row is written into a small reused
+    buffer, so memory stays flat however many bookings match and the
+    download starts before the scan finishes.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    def line(row: list) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue()
+    
+    yield line(_CSV_EXPORT_HEADER)
+    
+    # Dates are cut from isoformat() rather than strftime(), which is much
+    # cheaper per call; the slice drops any UTC offset from timestamptz
+    # values so the columns keep their "YYYY-MM-DD HH:MM:SS" shape
+    for booking in crud.iter_booking_export_rows(
+        db, status=status, date_from=date_from, date_to=date_to
+    ):
+        yield line([
+            booking.id,
+            booking.client_name,
+            booking.client_email,
+            booking.client_phone,
+            booking.event_name,
+            booking.event_type,
+            booking.event_date.isoformat()[:10] if booking.event_date else '',
+            booking.event_time,
+            booking.event_location,
+            booking.service_package,
+            booking.display_duration,
+            booking.total_price,
+            booking.deposit_paid,
+            booking.balance_due,
+            booking.booking_status.value,
+            booking.payment_status.value,
+            booking.created_at.isoformat(' ', 'seconds')[:19] if booking.created_at else '',
+            booking.confirmed_at.isoformat(' ', 'seconds')[:19] if booking.confirmed_at else '',
+            booking.completed_at.isoformat(' ', 'seconds')[:19] if booking.completed_at else '',
+            booking.special_instructions or '',
+            booking.emergency_contact or ''
+        ])
+
+
+def _booking_export_dict(booking) -> Dict[str, Any]:
+    """
+    Nested JSON export representation of one booking export row.
+    
+    Dates, datetimes and status enums are left as-is: orjson encodes them
+    itself (ISO 8601 and enum values), which is byte-for-byte what
+    ``isoformat()``/``.value`` produced.
+    """
+    return {
+        "id": booking.id,
+        "client": {
+            "name": booking.client_name,
+            "email": booking.client_email,
+            "phone": booking.client_phone
+        },
+        "event": {
+            "name": booking.event_name,
+            "type": booking.event_type,
+            "date": booking.event_date,
+            "time": booking.event_time,
+            "location": booking.event_location
+        },
+        "service": {
+            "package": booking.service_package,
+            "duration": booking.display_duration
+        },
+        "pricing": {
+            "total": booking.total_price,
+            "deposit_paid": booking.deposit_paid,
+            "balance_due": booking.balance_due
+        },
+        "status": {
+            "booking": booking.booking_status,
+            "payment": booking.payment_status
+        },
+        "timestamps": {
+            "created": booking.created_at,
+            "confirmed": booking.confirmed_at,
+            "completed": booking.completed_at
+        },
+        "notes": {
+            "special_instructions": booking.special_instructions,
+            "emergency_contact": booking.emergency_contact
+        }
+    }
+
+
+def _json_export_chunks(
+    db: Session,
+    status: Optional[str],
+    date_from: Optional[date],
+    date_to: Optional[date],
+    export_info: Dict[str, Any]
+):
+    """
+    Yield the bookings export as one JSON document, a booking at a time.
+    
+    Each booking row is serialised with orjson as it comes off the cursor;
+    ``count`` and ``export_info`` follow the ``data`` array because the
+    count is only known once the scan is done.
+    """
+    yield b'{"success":true,"data":['
+    
+    count = 0
+    for booking in crud.iter_booking_export_rows(
+        db, status=status, date_from=date_from, date_to=date_to
+    ):
+        chunk = orjson.dumps(_booking_export_dict(booking))
+        yield b"," + chunk if count else chunk
+        count += 1
+    
+    yield b'],"count":%d,"export_info":%b}' % (count, orjson.dumps(export_info))
+
+
 @router.get("/bookings/export")
 async def export_bookings(
     format: str = Query("csv", regex="^(csv|json)$"),
@@ -203,130 +349,33 @@ async def export_bookings(
     - Includes all booking details
     """
     try:
-        # Get bookings with filters
-        bookings = booking_crud.get_bookings(
-            db=db,
-            date_from=date_from,
-            date_to=date_to,
-            status=status,
-            limit=10000  # Increased limit for exports
-        )
-        
         if format == "csv":
-            # Create CSV output
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            writer.writerow([
-                "ID", "Client Name", "Client Email", "Client Phone",
-                "Event Name", "Event Type", "Event Date", "Event Time",
-                "Location", "Service Package", "Duration",
-                "Total Price", "Deposit Paid", "Balance Due",
-                "Booking Status", "Payment Status",
-                "Created At", "Confirmed At", "Completed At",
-                "Special Instructions", "Emergency Contact"
-            ])
-            
-            # Write data
-            for booking in bookings:
-                writer.writerow([
-                    booking.id,
-                    booking.client_name,
-                    booking.client_email,
-                    booking.client_phone,
-                    booking.event_name,
-                    booking.event_type,
-                    booking.event_date.strftime('%Y-%m-%d') if booking.event_date else '',
-                    booking.event_time,
-                    booking.event_location,
-                    booking.service_package,
-                    booking.display_duration,
-                    booking.total_price,
-                    booking.deposit_paid,
-                    booking.balance_due,
-                    booking.booking_status.value,
-                    booking.payment_status.value,
-                    booking.created_at.strftime('%Y-%m-%d %H:%M:%S') if booking.created_at else '',
-                    booking.confirmed_at.strftime('%Y-%m-%d %H:%M:%S') if booking.confirmed_at else '',
-                    booking.completed_at.strftime('%Y-%m-%d %H:%M:%S') if booking.completed_at else '',
-                    booking.special_instructions or '',
-                    booking.emergency_contact or ''
-                ])
-            
-            # Prepare response
-            output.seek(0)
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"bookings_export_{timestamp}.csv"
             
             return StreamingResponse(
-                iter([output.getvalue()]),
+                _csv_export_rows(db, status, date_from, date_to),
                 media_type="text/csv",
                 headers={"Content-Disposition": f"attachment; filename={filename}"}
             )
         
         else:  # JSON format
-            # Convert bookings to dict list
-            bookings_data = []
-            for booking in bookings:
-                booking_dict = {
-                    "id": booking.id,
-                    "client": {
-                        "name": booking.client_name,
-                        "email": booking.client_email,
-                        "phone": booking.client_phone
-                    },
-                    "event": {
-                        "name": booking.event_name,
-                        "type": booking.event_type,
-                        "date": booking.event_date.isoformat() if booking.event_date else None,
-                        "time": booking.event_time,
-                        "location": booking.event_location
-                    },
-                    "service": {
-                        "package": booking.service_package,
-                        "duration": booking.display_duration
-                    },
-                    "pricing": {
-                        "total": booking.total_price,
-                        "deposit_paid": booking.deposit_paid,
-                        "balance_due": booking.balance_due
-                    },
-                    "status": {
-                        "booking": booking.booking_status.value,
-                        "payment": booking.payment_status.value
-                    },
-                    "timestamps": {
-                        "created": booking.created_at.isoformat() if booking.created_at else None,
-                        "confirmed": booking.confirmed_at.isoformat() if booking.confirmed_at else None,
-                        "completed": booking.completed_at.isoformat() if booking.completed_at else None
-                    },
-                    "notes": {
-                        "special_instructions": booking.special_instructions,
-                        "emergency_contact": booking.emergency_contact
-                    }
-                }
-                bookings_data.append(booking_dict)
-            
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"bookings_export_{timestamp}.json"
+            export_info = {
+                "format": "json",
+                "generated_at": datetime.now().isoformat(),
+                "generated_by": current_user.email,
+                "filters": {
+                    "date_from": date_from.isoformat() if date_from else None,
+                    "date_to": date_to.isoformat() if date_to else None,
+                    "status": status
+                }
+            }
             
-            return JSONResponse(
-                content={
-                    "success": True,
-                    "count": len(bookings_data),
-                    "data": bookings_data,
-                    "export_info": {
-                        "format": "json",
-                        "generated_at": datetime.now().isoformat(),
-                        "generated_by": current_user.email,
-                        "filters": {
-                            "date_from": date_from.isoformat() if date_from else None,
-                            "date_to": date_to.isoformat() if date_to else None,
-                            "status": status
-                        }
-                    }
-                },
+            return StreamingResponse(
+                _json_export_chunks(db, status, date_from, date_to, export_info),
+                media_type="application/json",
                 headers={"Content-Disposition": f"attachment; filename={filename}"}
             )
         
@@ -501,18 +550,8 @@ async def generate_report(
                 detail="Date range cannot exceed 1 year"
             )
         
-        report_data = {}
-        
-        if report_type == "bookings":
-            report_data = generate_booking_report(db, start_date, end_date, group_by)
-        elif report_type == "revenue":
-            report_data = generate_revenue_report(db, start_date, end_date, group_by)
-        elif report_type == "contacts":
-            report_data = generate_contact_report(db, start_date, end_date, group_by)
-        elif report_type == "services":
-            report_data = generate_service_report(db, start_date, end_date)
-        elif report_type == "testimonials":
-            report_data = generate_testimonial_report(db, start_date, end_date)
+        # report_type is limited to REPORT_HANDLERS' keys by the regex above
+        report_data = REPORT_HANDLERS[report_type](db, start_date, end_date, group_by)
         
         return {
             "success": True,
@@ -602,7 +641,7 @@ async def get_audit_logs(
 
 @router.post("/system/maintenance")
 async def perform_maintenance(
-    action: str = Query(..., regex="^(backup|cleanup|cache_clear)$"),
+    action: str = Query(..., regex="^(backup|cleanup|cache_clear|refresh_stats)$"),
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
@@ -623,10 +662,18 @@ async def perform_maintenance(
             message = "System cleanup completed"
             
         elif action == "cache_clear":
-            # Clear cache
+            # Clear cache (this worker's dashboard stats; others expire by TTL)
+            _dashboard_stats_cache.clear()
             result = {"status": "cache_cleared", "cache_type": "all"}
             message = "System cache cleared"
         
+        elif action == "refresh_stats":
+            # Rebuild the dashboard rollup views (PostgreSQL only)
+            crud.refresh_stats_rollups(db)
+            _dashboard_stats_cache.clear()
+            result = {"status": "stats_refreshed"}
+            message = "Dashboard statistics refreshed"
+        
         logger.warning(f"System maintenance performed: Action={action}, By={current_user.email}")
         
         return {
@@ -645,8 +692,7 @@ async def perform_maintenance(
 
 @router.get("/system/health")
 async def system_health_check(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_admin_user)
 ) -> Dict[str, Any]:
     """
     Detailed system health check (admin only).
@@ -657,17 +703,17 @@ async def system_health_check(
         health_checks = {}
         
         # Database health
-        try:
-            db.execute("SELECT 1")
+        database_error = await run_in_threadpool(probe_database)
+        if database_error is None:
             health_checks["database"] = {
                 "status": "healthy",
                 "response_time": "fast",
                 "connection": "established"
             }
-        except Exception as e:
+        else:
             health_checks["database"] = {
                 "status": "unhealthy",
-                "error": str(e)
+                "error": database_error
             }
         
         # Email service health
@@ -722,18 +768,34 @@ async def system_health_check(
 # Report generation helper functions
 def generate_booking_report(db: Session, start_date: date, end_date: date, group_by: str) -> Dict[str, Any]:
     """Generate booking report with grouping."""
-    # This would query bookings and group by date
-    # Placeholder implementation
+    # Grouping and aggregation run in the database; this single pass only
+    # folds the (period, status) rows into trends and per-status totals
+    by_status = dict.fromkeys((s.value for s in BookingStatus), 0)
+    trends: List[Dict[str, Any]] = []
+    trend = None
+    for bucket, booking_status, count, revenue in crud.aggregate_bookings_by_period(
+        db, start_date, end_date, group_by
+    ):
+        period = str(bucket)[:10]  # datetime on PostgreSQL, text on SQLite
+        if trend is None or trend["period"] != period:
+            trend = {"period": period, "bookings": 0, "revenue": 0.0}
+            trends.append(trend)
+        trend["bookings"] += count
+        trend["revenue"] += float(revenue)
+        by_status[booking_status.value] += count
+    
+    total_bookings = sum(by_status.values())
+    completed_bookings = by_status[BookingStatus.COMPLETED.value]
     return {
         "summary": {
-            "total_bookings": 0,
-            "completed_bookings": 0,
-            "cancelled_bookings": 0,
-            "conversion_rate": 0
+            "total_bookings": total_bookings,
+            "completed_bookings": completed_bookings,
+            "cancelled_bookings": by_status[BookingStatus.CANCELLED.value],
+            "conversion_rate": (completed_bookings / total_bookings * 100) if total_bookings else 0
         },
-        "trends": [],
-        "by_status": {},
-        "by_service_type": {}
+        "trends": trends,
+        "by_status": by_status,
+        "by_service_type": crud.aggregate_bookings_by_service_type(db, start_date, end_date)
     }
 
 
@@ -798,4 +860,14 @@ def generate_testimonial_report(db: Session, start_date: date, end_date: date) -
         "rating_distribution": {},
         "by_event_type": {},
         "featured_testimonials": []
-    }
\ No newline at end of file
+    }
+
+
+# report_type -> helper, all called as (db, start_date, end_date, group_by)
+REPORT_HANDLERS: Dict[str, Callable[[Session, date, date, str], Dict[str, Any]]] = {
+    "bookings": generate_booking_report,
+    "revenue": generate_revenue_report,
+    "contacts": generate_contact_report,
+    "services": lambda db, start_date, end_date, group_by: generate_service_report(db, start_date, end_date),
+    "testimonials": lambda db, start_date, end_date, group_by: generate_testimonial_report(db, start_date, end_date),
+}
@@ -7,13 +7,17 @@ Includes password reset functionality and admin user management.
 """
 
 from datetime import datetime, timedelta, UTC
-from typing import Dict, Any, Optional
+from typing import Annotated, Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr, Field, validator
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, EmailStr, Field, StringConstraints, field_validator
+import logging
 import secrets
-import re
+from string import Template
 
 from app.core.database import get_db
 from app.core.security import (
@@ -29,41 +33,61 @@ from app.models import User
 from app.schemas import UserCreate, UserResponse, Token, PasswordResetRequest, PasswordResetConfirm
 from app.crud import user as user_crud
 
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], default_response_class=ORJSONResponse)
+
+logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+# Length, charset and lowercasing all run in pydantic-core, not in Python
+Username = Annotated[
+    str,
+    StringConstraints(min_length=3, max_length=50, pattern=r'^[a-zA-Z0-9._-]+$', to_lower=True)
+]
+
+# Password character classes, one bit each, indexed by byte value.
+# Non-ASCII bytes map to 0, as they never matched the old ASCII regexes.
+_PW_UPPER, _PW_LOWER, _PW_DIGIT, _PW_SPECIAL = 1, 2, 4, 8
+_PW_CLASS_TABLE = bytearray(256)
+for _c in b'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
+    _PW_CLASS_TABLE[_c] = _PW_UPPER
+for _c in b'abcdefghijklmnopqrstuvwxyz':
+    _PW_CLASS_TABLE[_c] = _PW_LOWER
+for _c in b'0123456789':
+    _PW_CLASS_TABLE[_c] = _PW_DIGIT
+for _c in b'!@#$%^&*(),.?":{}|<>':
+    _PW_CLASS_TABLE[_c] = _PW_SPECIAL
+_PW_CLASS_TABLE = bytes(_PW_CLASS_TABLE)
+del _c
+
 class LoginRequest(BaseModel):
     """Login request schema."""
-    username: str = Field(..., min_length=3, max_length=50)
+    username: Username
     password: str = Field(..., min_length=8)
-    
-    @validator("username")
-    def validate_username(cls, v: str) -> str:
-        """Validate username format."""
-        if not re.match(r'^[a-zA-Z0-9._-]+$', v):
-            raise ValueError("Username can only contain letters, numbers, dots, underscores, and hyphens")
-        return v.lower()
 
 class RegisterRequest(UserCreate):
     """Registration request schema with additional validation."""
     
-    @validator("password")
+    @field_validator("password")
+    @classmethod
     def validate_password(cls, v: str) -> str:
         """Validate password strength."""
         if len(v) < 8:
             raise ValueError("Password must be at least 8 characters long")
-        if not re.search(r'[A-Z]', v):
+        # One C-level pass classifies every byte; the set holds the classes seen
+        classes = set(v.encode("utf-8").translate(_PW_CLASS_TABLE))
+        if _PW_UPPER not in classes:
             raise ValueError("Password must contain at least one uppercase letter")
-        if not re.search(r'[a-z]', v):
+        if _PW_LOWER not in classes:
             raise ValueError("Password must contain at least one lowercase letter")
-        if not re.search(r'[0-9]', v):
+        if _PW_DIGIT not in classes:
             raise ValueError("Password must contain at least one digit")
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', v):
+        if _PW_SPECIAL not in classes:
             raise ValueError("Password must contain at least one special character")
         return v
     
-    @validator("email")
+    @field_validator("email")
+    @classmethod
     def validate_email(cls, v: str) -> str:
         """Validate email domain and format."""
         # Additional email validation can be added here
@@ -103,8 +127,8 @@ async def register(
                 detail="Email already registered"
             )
         
-        # Create user
-        user = user_crud.create_user(db, user_data)
+        # Create user (hashes the password, so keep it off the event loop)
+        user = await run_in_threadpool(user_crud.create_user, db, user_data)
         
         # Send welcome email in background
         background_tasks.add_task(
@@ -127,6 +151,21 @@ async def register(
         )
 
 
+def _get_user_by_login(db: Session, identifier: str) -> Optional[User]:
+    """
+    Look a user up by username or email in one query.
+    
+    A username match wins over an email match, as with the separate
+    username-then-email lookups this replaces.
+    """
+    return db.execute(
+        select(User)
+        .where(or_(User.username == identifier, User.email == identifier))
+        .order_by((User.username == identifier).desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -140,19 +179,16 @@ async def login(
     """
     try:
         # Get user by username or email
-        user = user_crud.get_user_by_username(db, form_data.username)
+        user = _get_user_by_login(db, form_data.username)
         if not user:
-            # Try email
-            user = user_crud.get_user_by_email(db, form_data.username)
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Incorrect username or password",
-                    headers={"WWW-Authenticate": "Bearer"}
-                )
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
         
-        # Verify password
-        if not verify_password(form_data.password, user.hashed_password):
+        # Verify password (bcrypt is deliberately slow, run it in a worker thread)
+        if not await run_in_threadpool(verify_password, form_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
@@ -309,7 +345,7 @@ async def confirm_password_reset(
             )
         
         # Update password
-        user.hashed_password = get_password_hash(reset_data.new_password)
+        user.hashed_password = await run_in_threadpool(get_password_hash, reset_data.new_password)
         user.reset_token = None
         user.reset_token_expiry = None
         user.updated_at = datetime.now(UTC)
@@ -371,8 +407,17 @@ async def update_current_user(
                 detail="No valid fields to update"
             )
         
+        # Only write fields that actually change; profile forms often resubmit
+        # every field, and an unchanged profile needs no UPDATE or commit
+        changes = {
+            k: v for k, v in update_data.items()
+            if getattr(current_user, k) != v
+        }
+        if not changes:
+            return current_user
+        
         # Update user
-        updated_user = user_crud.update_user(db, current_user.id, update_data)
+        updated_user = user_crud.update_user(db, current_user.id, changes)
         
         return updated_user
         
@@ -409,13 +454,15 @@ async def logout(
 
 
 # Email helper functions
-async def send_welcome_email(email: str, name: str) -> None:
-    """Send welcome email to new user."""
-    subject = "🎆 Welcome to IGNUX!"
-    body = f"""
+# Bodies are built once at import: company constants are filled in here
+# ("$" escaped so they survive substitution) and only the per-recipient
+# fields are substituted when an email is sent.
+_COMPANY_PHONE = str(settings.COMPANY_PHONE).replace("$", "$$")
+
+_WELCOME_EMAIL = Template(f"""
     <html>
     <body>
-        <h2>Welcome to IGNUX, {name}!</h2>
+        <h2>Welcome to IGNUX, $name!</h2>
         <p>Thank you for registering an account with IGNUX Fireworks & Stage FX.</p>
         <p>With your account, you can:</p>
         <ul>
@@ -424,33 +471,22 @@ async def send_welcome_email(email: str, name: str) -> None:
             <li>Receive special offers</li>
             <li>Save your preferences</li>
         </ul>
-        <p>If you have any questions, contact us at {settings.COMPANY_PHONE}.</p>
+        <p>If you have any questions, contact us at {_COMPANY_PHONE}.</p>
         <br>
         <p>Best regards,</p>
         <p>The IGNUX Team</p>
     </body>
     </html>
-    """
-    
-    try:
-        email_service.send_email(email, subject, body, is_html=True)
-    except Exception as e:
-        # Log error but don't fail registration
-        print(f"Failed to send welcome email: {e}")
+    """)
 
-
-async def send_password_reset_email(email: str, name: str, token: str) -> None:
-    """Send password reset email."""
-    reset_url = f"{settings.FRONTEND_URL}/reset-password?token={token}"
-    subject = "🔐 IGNUX Password Reset Request"
-    body = f"""
+_PASSWORD_RESET_EMAIL = Template("""
     <html>
     <body>
         <h2>Password Reset Request</h2>
-        <p>Hello {name},</p>
+        <p>Hello $name,</p>
         <p>You requested to reset your IGNUX account password.</p>
         <p>Click the link below to reset your password:</p>
-        <p><a href="{reset_url}">{reset_url}</a></p>
+        <p><a href="$reset_url">$reset_url</a></p>
         <p>This link will expire in 24 hours.</p>
         <p>If you didn't request this, please ignore this email.</p>
         <br>
@@ -458,35 +494,57 @@ async def send_password_reset_email(email: str, name: str, token: str) -> None:
         <p>The IGNUX Team</p>
     </body>
     </html>
-    """
-    
-    try:
-        email_service.send_email(email, subject, body, is_html=True)
-    except Exception as e:
-        print(f"Failed to send password reset email: {e}")
-
+    """)
 
-async def send_password_changed_email(email: str, name: str) -> None:
-    """Send password changed confirmation email."""
-    subject = "✅ IGNUX Password Changed"
-    body = f"""
+_PASSWORD_CHANGED_EMAIL = Template(f"""
     <html>
     <body>
         <h2>Password Changed Successfully</h2>
-        <p>Hello {name},</p>
+        <p>Hello $name,</p>
         <p>Your IGNUX account password has been changed successfully.</p>
-        <p>If you didn't make this change, please contact us immediately at {settings.COMPANY_PHONE}.</p>
+        <p>If you didn't make this change, please contact us immediately at {_COMPANY_PHONE}.</p>
         <br>
         <p>Best regards,</p>
         <p>The IGNUX Team</p>
     </body>
     </html>
-    """
+    """)
+
+_RESET_URL_BASE = f"{settings.FRONTEND_URL}/reset-password?token="
+
+
+async def send_welcome_email(email: str, name: str) -> None:
+    """Send welcome email to new user."""
+    subject = "🎆 Welcome to IGNUX!"
+    body = _WELCOME_EMAIL.substitute(name=name)
     
     try:
-        email_service.send_email(email, subject, body, is_html=True)
-    except Exception as e:
-        print(f"Failed to send password changed email: {e}")
+        await email_service.send_email_async(email, subject, body, is_html=True)
+    except Exception:
+        # Log error but don't fail registration
+        logger.exception("Failed to send welcome email to %s", email)
+
+
+async def send_password_reset_email(email: str, name: str, token: str) -> None:
+    """Send password reset email."""
+    subject = "🔐 IGNUX Password Reset Request"
+    body = _PASSWORD_RESET_EMAIL.substitute(name=name, reset_url=_RESET_URL_BASE + token)
+    
+    try:
+        await email_service.send_email_async(email, subject, body, is_html=True)
+    except Exception:
+        logger.exception("Failed to send password reset email to %s", email)
+
+
+async def send_password_changed_email(email: str, name: str) -> None:
+    """Send password changed confirmation email."""
+    subject = "✅ IGNUX Password Changed"
+    body = _PASSWORD_CHANGED_EMAIL.substitute(name=name)
+    
+    try:
+        await email_service.send_email_async(email, subject, body, is_html=True)
+    except Exception:
+        logger.exception("Failed to send password changed email to %s", email)
 
 
 # Admin endpoints
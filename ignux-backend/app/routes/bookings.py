@@ -10,7 +10,7 @@ This module handles all booking-related operations including:
 """
 
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, asc, func
@@ -19,7 +19,7 @@ import logging
 from app.core.database import get_db
 from app.core.security import get_current_user, get_current_admin_user
 from app.core.config import settings
-from app.core.email_service import email_service
+from app.core.email_service import email_service, deposit_for
 from app.core.payment_service import payment_service
 from app.models import User, Booking, BookingStatus, PaymentStatus
 from app.schemas import (
@@ -66,15 +66,9 @@ async def create_booking(
         # Create booking
         booking = booking_crud.create_booking(db, booking_data, created_by=current_user.id if current_user else None)
         
-        # Send confirmation email to client
+        # Send confirmation email to client and notify admin
         background_tasks.add_task(
-            send_booking_confirmation_email,
-            booking
-        )
-        
-        # Send admin notification
-        background_tasks.add_task(
-            send_admin_booking_notification,
+            send_booking_created_emails,
             booking
         )
         
@@ -504,7 +498,9 @@ async def check_availability(
             current_date = date_from + timedelta(days=i)
             all_dates.append(current_date.isoformat())
         
-        available_dates = [d for d in all_dates if d not in booked_dates]
+        # One set lookup per day instead of rescanning booked_dates
+        booked = set(booked_dates)
+        available_dates = [d for d in all_dates if d not in booked]
         
         return {
             "date_from": date_from.isoformat(),
@@ -602,8 +598,8 @@ async def cancel_booking(
 
 
 # Email helper functions
-async def send_booking_confirmation_email(booking: Booking) -> None:
-    """Send booking confirmation email to client."""
+def booking_confirmation_email(booking: Booking) -> Tuple[str, str, str, bool]:
+    """Build the booking confirmation email to the client."""
     subject = f"🎆 IGNUX Booking Confirmation #{booking.id}"
     
     html_body = f"""
@@ -631,7 +627,7 @@ async def send_booking_confirmation_email(booking: Booking) -> None:
                     
                     <h3>💰 Payment Information</h3>
                     <p><strong>Total Amount:</strong> KES {booking.total_price:,.2f}</p>
-                    <p><strong>Deposit Required:</strong> KES {booking.total_price * 0.3:,.2f}</p>
+                    <p><strong>Deposit Required:</strong> KES {deposit_for(booking.total_price):,.2f}</p>
                     <p><strong>Current Status:</strong> {booking.booking_status.value.title()}</p>
                 </div>
                 
@@ -656,14 +652,11 @@ async def send_booking_confirmation_email(booking: Booking) -> None:
     </html>
     """
     
-    try:
-        email_service.send_email(booking.client_email, subject, html_body, is_html=True)
-    except Exception as e:
-        logger.error(f"Failed to send booking confirmation email: {e}")
+    return booking.client_email, subject, html_body, True
 
 
-async def send_admin_booking_notification(booking: Booking) -> None:
-    """Send booking notification to admin."""
+def admin_booking_notification_email(booking: Booking) -> Tuple[str, str, str, bool]:
+    """Build the new-booking notification email to the admin."""
     subject = f"📋 New Booking Received - #{booking.id} - {booking.event_name}"
     
     body = f"""
@@ -688,10 +681,18 @@ async def send_admin_booking_notification(booking: Booking) -> None:
     Please review in the admin panel.
     """
     
+    return settings.EMAIL_ADMIN, subject, body, False
+
+
+async def send_booking_created_emails(booking: Booking) -> None:
+    """Send the client confirmation and admin notification over one SMTP connection."""
     try:
-        email_service.send_email(settings.EMAIL_ADMIN, subject, body)
+        await email_service.send_batch_async([
+            booking_confirmation_email(booking),
+            admin_booking_notification_email(booking),
+        ])
     except Exception as e:
-        logger.error(f"Failed to send admin booking notification: {e}")
+        logger.error(f"Failed to send booking created emails: {e}")
 
 
 async def send_booking_update_email(booking: Booking, updated_by: str) -> None:
@@ -712,7 +713,7 @@ async def send_booking_update_email(booking: Booking, updated_by: str) -> None:
     """
     
     try:
-        email_service.send_email(booking.client_email, subject, html_body, is_html=True)
+        await email_service.send_email_async(booking.client_email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send booking update email: {e}")
 
@@ -754,7 +755,7 @@ async def send_booking_status_email(
     """
     
     try:
-        email_service.send_email(booking.client_email, subject, html_body, is_html=True)
+        await email_service.send_email_async(booking.client_email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send booking status email: {e}")
 
@@ -790,7 +791,7 @@ async def send_payment_confirmation_email(booking: Booking, payment: PaymentReco
     """
     
     try:
-        email_service.send_email(booking.client_email, subject, html_body, is_html=True)
+        await email_service.send_email_async(booking.client_email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send payment confirmation email: {e}")
 
@@ -822,6 +823,6 @@ async def send_booking_cancellation_email(
     """
     
     try:
-        email_service.send_email(booking.client_email, subject, html_body, is_html=True)
+        await email_service.send_email_async(booking.client_email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send cancellation email: {e}")
\ No newline at end of file
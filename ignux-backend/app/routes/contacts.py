@@ -532,7 +532,7 @@ async def send_contact_confirmation_email(contact_message: ContactMessage) -> No
     """
     
     try:
-        email_service.send_email(contact_message.email, subject, html_body, is_html=True)
+        await email_service.send_email_async(contact_message.email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send contact confirmation email: {e}")
 
@@ -566,7 +566,7 @@ async def send_admin_contact_notification(contact_message: ContactMessage) -> No
     """
     
     try:
-        email_service.send_email(settings.EMAIL_ADMIN, subject, body)
+        await email_service.send_email_async(settings.EMAIL_ADMIN, subject, body)
     except Exception as e:
         logger.error(f"Failed to send admin contact notification: {e}")
 
@@ -607,7 +607,7 @@ async def send_quote_request_to_admin(
     """
     
     try:
-        email_service.send_email(settings.EMAIL_ADMIN, subject, body)
+        await email_service.send_email_async(settings.EMAIL_ADMIN, subject, body)
     except Exception as e:
         logger.error(f"Failed to send quote request to admin: {e}")
 
@@ -648,6 +648,6 @@ async def send_quote_confirmation_email(quote_request: QuoteRequest) -> None:
     """
     
     try:
-        email_service.send_email(quote_request.contact_email, subject, html_body, is_html=True)
+        await email_service.send_email_async(quote_request.contact_email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send quote confirmation email: {e}")
\ No newline at end of file
@@ -710,7 +710,7 @@ async def send_testimonial_submission_notification(testimonial: Testimonial) ->
     """
     
     try:
-        email_service.send_email(settings.EMAIL_ADMIN, subject, body)
+        await email_service.send_email_async(settings.EMAIL_ADMIN, subject, body)
     except Exception as e:
         logger.error(f"Failed to send testimonial submission notification: {e}")
 
@@ -745,7 +745,7 @@ async def send_testimonial_confirmation_email(testimonial: Testimonial) -> None:
         # Get email from testimonial or use contact form
         # In a real app, testimonials would have email field
         if hasattr(testimonial, 'client_email') and testimonial.client_email:
-            email_service.send_email(testimonial.client_email, subject, html_body, is_html=True)
+            await email_service.send_email_async(testimonial.client_email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send testimonial confirmation email: {e}")
 
@@ -778,7 +778,7 @@ async def send_testimonial_approval_email(testimonial: Testimonial, featured: bo
     
     try:
         if hasattr(testimonial, 'client_email') and testimonial.client_email:
-            email_service.send_email(testimonial.client_email, subject, html_body, is_html=True)
+            await email_service.send_email_async(testimonial.client_email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send testimonial approval email: {e}")
 
@@ -830,7 +830,7 @@ async def send_newsletter_welcome_email(subscriber: NewsletterSubscriber) -> Non
     """
     
     try:
-        email_service.send_email(subscriber.email, subject, html_body, is_html=True)
+        await email_service.send_email_async(subscriber.email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send newsletter welcome email: {e}")
 
@@ -861,6 +861,6 @@ async def send_newsletter_unsubscribe_email(
     """
     
     try:
-        email_service.send_email(subscriber.email, subject, html_body, is_html=True)
+        await email_service.send_email_async(subscriber.email, subject, html_body, is_html=True)
     except Exception as e:
         logger.error(f"Failed to send unsubscribe confirmation email: {e}")
\ No newline at end of file
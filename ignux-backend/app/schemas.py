@@ -3,7 +3,6 @@ from pydantic import BaseModel, EmailStr, Field, validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 from enum import Enum
-import json
 
 class BookingStatusEnum(str, Enum):
     PENDING = "pending"
@@ -53,17 +52,14 @@ class BookingBase(BaseModel):
     insurance_required: bool = False
 
 class BookingCreate(BookingBase):
+    # Stored as JSON columns; empty values are kept as NULL
     @validator('additional_services')
     def validate_additional_services(cls, v):
-        if v:
-            return json.dumps(v)
-        return None
+        return v or None
     
     @validator('special_effects')
     def validate_special_effects(cls, v):
-        if v:
-            return json.dumps(v)
-        return None
+        return v or None
 
 class BookingResponse(BookingBase):
     id: int
@@ -120,9 +116,7 @@ class ServiceBase(BaseModel):
 class ServiceCreate(ServiceBase):
     @validator('features')
     def validate_features(cls, v):
-        if v:
-            return json.dumps(v)
-        return None
+        return v or None
 
 class ServiceResponse(ServiceBase):
     id: int
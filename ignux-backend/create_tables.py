@@ -3,12 +3,12 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import engine
+from app.database import get_engine
 from app.models import Base
 
 print("Creating database tables...")
 try:
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
     print("✅ Tables created successfully!")
 except Exception as e:
     print(f"❌ Error creating tables: {e}")
\ No newline at end of file
@@ -0,0 +1,26 @@
+-- Store money as numeric(10,2) and small counters as smallint
+-- Run once against an existing PostgreSQL database:
+--   psql -U ignux_user -d ignux_db -f migrate_column_sizes.sql
+
+BEGIN;
+
+ALTER TABLE bookings
+    ALTER COLUMN base_price TYPE numeric(10,2),
+    ALTER COLUMN additional_charges TYPE numeric(10,2),
+    ALTER COLUMN discount TYPE numeric(10,2),
+    ALTER COLUMN total_price TYPE numeric(10,2),
+    ALTER COLUMN deposit_paid TYPE numeric(10,2),
+    ALTER COLUMN balance_due TYPE numeric(10,2),
+    ALTER COLUMN team_size TYPE smallint;
+
+ALTER TABLE services
+    ALTER COLUMN base_price TYPE numeric(10,2),
+    ALTER COLUMN price_range_min TYPE numeric(10,2),
+    ALTER COLUMN price_range_max TYPE numeric(10,2),
+    ALTER COLUMN display_order TYPE smallint;
+
+ALTER TABLE testimonials
+    ALTER COLUMN rating TYPE smallint,
+    ALTER COLUMN helpful_votes TYPE smallint;
+
+COMMIT;
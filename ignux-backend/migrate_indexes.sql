@@ -0,0 +1,22 @@
+-- Drop single-column indexes now covered by composites, and create the
+-- renamed payment status composite
+-- create_all never drops or renames indexes, so existing databases keep
+-- the old ones until this runs. The status indexes and the partial
+-- ix_bookings_open index are handled by migrate_status_columns.sql.
+-- Run once against an existing PostgreSQL database:
+--   psql -U ignux_user -d ignux_db -f migrate_indexes.sql
+
+BEGIN;
+
+-- Leading column of ix_bookings_email_status
+DROP INDEX IF EXISTS ix_bookings_client_email;
+
+-- Leading column of ix_contact_messages_created_at_read
+DROP INDEX IF EXISTS ix_contact_messages_created_at;
+
+-- The (payment_status, balance_due) composite used to share its name with
+-- the single-column payment_status index, so only one of them was created
+CREATE INDEX IF NOT EXISTS ix_bookings_payment_status_balance
+    ON bookings (payment_status, balance_due);
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- Convert the JSON-encoded text columns to native JSONB
+-- Run once against an existing PostgreSQL database:
+--   psql -U ignux_user -d ignux_db -f migrate_jsonb.sql
+
+BEGIN;
+
+ALTER TABLE bookings
+    ALTER COLUMN additional_services TYPE jsonb USING additional_services::jsonb,
+    ALTER COLUMN special_effects TYPE jsonb USING special_effects::jsonb;
+
+ALTER TABLE services
+    ALTER COLUMN features TYPE jsonb USING features::jsonb;
+
+-- Containment lookups on service features (features @> '["..."]')
+CREATE INDEX IF NOT EXISTS ix_services_features_gin
+    ON services USING gin (features);
+
+COMMIT;
@@ -0,0 +1,30 @@
+-- Convert the native bookingstatus/paymentstatus ENUM columns to
+-- VARCHAR(20) + CHECK, storing the lowercase status values
+-- Run once against an existing PostgreSQL database:
+--   psql -U ignux_user -d ignux_db -f migrate_status_columns.sql
+
+BEGIN;
+
+DROP INDEX IF EXISTS ix_bookings_booking_status;
+DROP INDEX IF EXISTS ix_bookings_payment_status;
+
+ALTER TABLE bookings
+    ALTER COLUMN booking_status TYPE varchar(20) USING lower(booking_status::text),
+    ALTER COLUMN payment_status TYPE varchar(20) USING lower(payment_status::text);
+
+ALTER TABLE bookings
+    ADD CONSTRAINT ck_booking_status CHECK (
+        booking_status IN ('pending', 'confirmed', 'in_progress', 'completed', 'cancelled')
+    ),
+    ADD CONSTRAINT ck_payment_status CHECK (
+        payment_status IN ('pending', 'partial', 'paid', 'refunded')
+    );
+
+DROP TYPE IF EXISTS bookingstatus;
+DROP TYPE IF EXISTS paymentstatus;
+
+CREATE INDEX IF NOT EXISTS ix_bookings_open
+    ON bookings (event_date)
+    WHERE booking_status IN ('pending', 'confirmed');
+
+COMMIT;
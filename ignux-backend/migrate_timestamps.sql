@@ -0,0 +1,54 @@
+-- Convert audit timestamps to timestamptz with database-side defaults
+-- Existing values are interpreted in the session time zone, which is the
+-- zone now() used when they were written.
+-- Run once against an existing PostgreSQL database:
+--   psql -U ignux_user -d ignux_db -f migrate_timestamps.sql
+
+BEGIN;
+
+ALTER TABLE contact_messages
+    ALTER COLUMN created_at TYPE timestamptz,
+    ALTER COLUMN created_at SET DEFAULT now();
+UPDATE contact_messages SET created_at = now() WHERE created_at IS NULL;
+ALTER TABLE contact_messages ALTER COLUMN created_at SET NOT NULL;
+
+ALTER TABLE bookings
+    ALTER COLUMN created_at TYPE timestamptz,
+    ALTER COLUMN created_at SET DEFAULT now(),
+    ALTER COLUMN updated_at TYPE timestamptz,
+    ALTER COLUMN updated_at SET DEFAULT now(),
+    ALTER COLUMN confirmed_at TYPE timestamptz,
+    ALTER COLUMN completed_at TYPE timestamptz;
+UPDATE bookings SET created_at = now() WHERE created_at IS NULL;
+UPDATE bookings SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE bookings
+    ALTER COLUMN created_at SET NOT NULL,
+    ALTER COLUMN updated_at SET NOT NULL;
+
+ALTER TABLE services
+    ALTER COLUMN created_at TYPE timestamptz,
+    ALTER COLUMN created_at SET DEFAULT now(),
+    ALTER COLUMN updated_at TYPE timestamptz,
+    ALTER COLUMN updated_at SET DEFAULT now();
+UPDATE services SET created_at = now() WHERE created_at IS NULL;
+UPDATE services SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE services
+    ALTER COLUMN created_at SET NOT NULL,
+    ALTER COLUMN updated_at SET NOT NULL;
+
+ALTER TABLE testimonials
+    ALTER COLUMN created_at TYPE timestamptz,
+    ALTER COLUMN created_at SET DEFAULT now();
+UPDATE testimonials SET created_at = now() WHERE created_at IS NULL;
+ALTER TABLE testimonials ALTER COLUMN created_at SET NOT NULL;
+
+ALTER TABLE newsletter_subscribers
+    ALTER COLUMN subscribed_at TYPE timestamptz,
+    ALTER COLUMN subscribed_at SET DEFAULT now(),
+    ALTER COLUMN unsubscribed_at TYPE timestamptz,
+    ALTER COLUMN consent_date TYPE timestamptz,
+    ALTER COLUMN consent_date SET DEFAULT now();
+UPDATE newsletter_subscribers SET subscribed_at = now() WHERE subscribed_at IS NULL;
+ALTER TABLE newsletter_subscribers ALTER COLUMN subscribed_at SET NOT NULL;
+
+COMMIT;
@@ -0,0 +1,39 @@
+-- Daily rollups read by the admin dashboard when STATS_ROLLUPS_ENABLED=true
+-- Create once against the PostgreSQL database:
+--   psql -U ignux_user -d ignux_db -f stats_rollups.sql
+-- Then refresh periodically (e.g. from cron), or through the admin
+-- POST /admin/system/maintenance?action=refresh_stats endpoint:
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY booking_stats_daily;
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY contact_stats_daily;
+
+BEGIN;
+
+-- Bookings per event day, creation day and status
+CREATE MATERIALIZED VIEW IF NOT EXISTS booking_stats_daily AS
+SELECT
+    event_date::date AS day,
+    created_at::date AS created_day,
+    booking_status,
+    count(*) AS bookings,
+    coalesce(sum(total_price), 0) AS revenue
+FROM bookings
+GROUP BY 1, 2, 3;
+
+-- A unique index is required for REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS ux_booking_stats_daily
+    ON booking_stats_daily (day, created_day, booking_status);
+
+-- Contact messages per day received
+CREATE MATERIALIZED VIEW IF NOT EXISTS contact_stats_daily AS
+SELECT
+    created_at::date AS day,
+    count(*) AS total,
+    count(*) FILTER (WHERE is_read = false) AS unread,
+    count(*) FILTER (WHERE responded = true) AS responded
+FROM contact_messages
+GROUP BY 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_contact_stats_daily
+    ON contact_stats_daily (day);
+
+COMMIT;